@@ -0,0 +1,436 @@
+"""
+Benchmark broadcast p.py tanpa akun Telegram sungguhan.
+
+Menjalankan autobc_task, gcast_handler (gikes) dan bcfd terhadap client palsu
+di memori dengan ribuan chat sintetis, lalu melaporkan sends/detik, waktu
+putaran dan puncak memori. Latensi, FloodWait dan ChannelPrivate bisa diatur.
+
+Contoh:
+    python bench.py --chats 10000 --latency 0.002 --flood-rate 0.001
+    python bench.py --scenario autobc --output bench_output.txt
+"""
+
+import argparse
+import asyncio
+import enum
+import importlib.util
+import os
+import random
+import sys
+import time
+import tracemalloc
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HANDLERS = {}  # perintah -> handler yang didaftarkan lewat PY.UBOT/PY.BOT
+VARS = {}  # (user_id, key) -> value, pengganti database vars
+
+
+# ---------------------------------------------------------------------------
+# Pengganti pyrogram, hanya dipakai bila pyrogram tidak terpasang
+# ---------------------------------------------------------------------------
+
+class _Filter:
+    def __and__(self, other):
+        return self
+
+    __or__ = __rand__ = __ror__ = __and__
+
+    def __invert__(self):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+
+def install_pyrogram_stub():
+    try:
+        import pyrogram  # noqa: F401
+        return
+    except ImportError:
+        pass
+
+    pyrogram = types.ModuleType("pyrogram")
+    filters = types.ModuleType("pyrogram.filters")
+    filters.__getattr__ = lambda name: _Filter()
+    pyrogram.filters = filters
+
+    class RPCError(Exception):
+        def __init__(self, value=None, *args, **kwargs):
+            super().__init__(value)
+            self.value = value
+
+    names = [
+        "RPCError", "FloodWait", "SlowmodeWait", "ChatWriteForbidden", "UserBannedInChannel",
+        "ChatRestricted", "ChannelInvalid", "PeerIdInvalid", "UserIsBlocked", "ChatAdminRequired",
+    ]
+    exceptions = types.ModuleType("pyrogram.errors.exceptions")
+    exceptions.RPCError = RPCError
+    for name in names[1:]:
+        setattr(exceptions, name, type(name, (RPCError,), {}))
+    not_acceptable = types.ModuleType("pyrogram.errors.exceptions.not_acceptable_406")
+    not_acceptable.ChannelPrivate = type("ChannelPrivate", (RPCError,), {})
+    exceptions.ChannelPrivate = not_acceptable.ChannelPrivate
+    exceptions.__all__ = names + ["ChannelPrivate"]
+    errors = types.ModuleType("pyrogram.errors")
+    errors.__dict__.update({name: getattr(exceptions, name) for name in exceptions.__all__})
+
+    enums = types.ModuleType("pyrogram.enums")
+    enums.ChatType = enum.Enum("ChatType", "PRIVATE BOT GROUP SUPERGROUP CHANNEL")
+    enums.ParseMode = enum.Enum("ParseMode", "DEFAULT MARKDOWN HTML DISABLED")
+
+    pyrogram_types = types.ModuleType("pyrogram.types")
+    for name in (
+        "InputTextMessageContent", "InlineKeyboardButton", "InlineKeyboardMarkup", "InlineQueryResultArticle",
+        "MessageEntity",
+    ):
+        setattr(pyrogram_types, name, type(name, (), {"__init__": lambda self, *a, **k: None}))
+
+    raw = types.ModuleType("pyrogram.raw")
+    functions = types.ModuleType("pyrogram.raw.functions")
+    messages = types.ModuleType("pyrogram.raw.functions.messages")
+    messages.DeleteHistory = messages.StartBot = lambda **kwargs: kwargs
+
+    modules = {
+        "pyrogram": pyrogram,
+        "pyrogram.filters": filters,
+        "pyrogram.errors": errors,
+        "pyrogram.errors.exceptions": exceptions,
+        "pyrogram.errors.exceptions.not_acceptable_406": not_acceptable,
+        "pyrogram.enums": enums,
+        "pyrogram.types": pyrogram_types,
+        "pyrogram.raw": raw,
+        "pyrogram.raw.functions": functions,
+        "pyrogram.raw.functions.messages": messages,
+    }
+    pyrogram.errors, pyrogram.enums, pyrogram.types, pyrogram.raw = errors, enums, pyrogram_types, raw
+    raw.functions, functions.messages = functions, messages
+    sys.modules.update(modules)
+
+
+# ---------------------------------------------------------------------------
+# Pengganti PyroUbot (ubot, PY, EMO, database vars)
+# ---------------------------------------------------------------------------
+
+def install_pyroubot_stub(db_latency):
+    module = types.ModuleType("PyroUbot")
+
+    async def db_delay():
+        if db_latency:
+            await asyncio.sleep(db_latency)
+
+    async def get_vars(user_id, key, query="vars"):
+        await db_delay()
+        return VARS.get((user_id, key))
+
+    async def set_vars(user_id, key, value, query="vars"):
+        await db_delay()
+        VARS[(user_id, key)] = value
+
+    async def get_list_from_vars(user_id, key, query="vars"):
+        value = await get_vars(user_id, key)
+        return [int(x) for x in str(value).split()] if value else []
+
+    async def add_to_vars(user_id, key, value, query="vars"):
+        values = await get_list_from_vars(user_id, key)
+        values.append(value)
+        await set_vars(user_id, key, " ".join(map(str, values)))
+
+    async def remove_from_vars(user_id, key, value, query="vars"):
+        values = await get_list_from_vars(user_id, key)
+        if value in values:
+            values.remove(value)
+            await set_vars(user_id, key, " ".join(map(str, values)))
+
+    def register(command):
+        def decorator(func):
+            HANDLERS[command] = func
+            return func
+        return decorator
+
+    class PY:
+        UBOT = BOT = INLINE = staticmethod(register)
+        TOP_CMD = ADMIN = GROUP = staticmethod(lambda func: func)
+
+    class _Emo:
+        def __getattr__(self, name):
+            async def emoji(client):
+                return ""
+            return emoji
+
+    class _Ubot:
+        _ubot = []
+
+        def on_message(self, *args, **kwargs):
+            return lambda func: func
+
+    def extract_type_and_msg(message):
+        args = message.text.split(None, 2)
+        if len(args) < 2:
+            return None, None
+        text = message.reply_to_message or (args[2] if len(args) > 2 else None)
+        return args[1], text
+
+    def get_message(message):
+        return message.reply_to_message or message.text.split(None, 1)[-1]
+
+    module.__dict__.update(
+        ubot=_Ubot(),
+        bot=types.SimpleNamespace(me=types.SimpleNamespace(id=1, username="bot", mention="@bot")),
+        PY=PY,
+        EMO=_Emo(),
+        BLACKLIST_CHAT=[],
+        get_vars=get_vars,
+        set_vars=set_vars,
+        get_list_from_vars=get_list_from_vars,
+        add_to_vars=add_to_vars,
+        remove_from_vars=remove_from_vars,
+        extract_type_and_msg=extract_type_and_msg,
+        get_message=get_message,
+        get_arg=lambda message: message.text.split(None, 1)[1] if " " in message.text else "",
+    )
+    module.__all__ = list(module.__dict__)
+    sys.modules["PyroUbot"] = module
+
+
+# ---------------------------------------------------------------------------
+# Client palsu
+# ---------------------------------------------------------------------------
+
+class FakeMessage:
+    def __init__(self, client, chat, message_id, text="", reply_to_message=None, empty=False):
+        self._client = client
+        self.chat = chat
+        self.id = message_id
+        self.text = text
+        self.reply_to_message = reply_to_message
+        self.reply_markup = None
+        self.empty = empty
+        self.command = text.split()
+
+    async def copy(self, chat_id, *args, **kwargs):
+        return await self._client._deliver(chat_id)
+
+    async def forward(self, chat_id, *args, **kwargs):
+        return await self._client._deliver(chat_id)
+
+    async def reply(self, text, *args, **kwargs):
+        return FakeMessage(self._client, self.chat, self.id + 1, str(text))
+
+    async def edit(self, text, *args, **kwargs):
+        self.text = str(text)
+        return self
+
+    async def delete(self, *args, **kwargs):
+        return True
+
+
+class FakeParser:
+    """Pengganti client.parser, hanya menghitung berapa kali teks di-parse"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def parse(self, text, mode=None):
+        self.calls += 1
+        return {"message": text, "entities": None}
+
+
+class FakeClient:
+    """
+    Pengganti client Pyrogram untuk metode yang dipakai p.py.
+
+    Args:
+        chats: Jumlah grup sintetis
+        latency: Latensi setiap panggilan API (detik)
+        flood_rate: Peluang sebuah pengiriman terkena FloodWait
+        flood_wait: Nilai FloodWait (detik)
+        private_rate: Porsi grup yang selalu gagal dengan ChannelPrivate
+    """
+
+    def __init__(self, chats, latency=0.0, flood_rate=0.0, flood_wait=1, private_rate=0.0, seed=0):
+        from pyrogram.enums import ChatType
+
+        self.me = types.SimpleNamespace(
+            id=777000, is_premium=False, username="bench", mention="@bench", first_name="bench"
+        )
+        self.latency = latency
+        self.flood_rate = flood_rate
+        self.flood_wait = flood_wait
+        self.random = random.Random(seed)
+        self.chats = [
+            types.SimpleNamespace(
+                id=-1000000000000 - i,
+                type=ChatType.SUPERGROUP,
+                title=f"group {i}",
+                first_name=None,
+            )
+            for i in range(chats)
+        ]
+        self.private = set(
+            chat.id for chat in self.random.sample(self.chats, int(chats * private_rate))
+        )
+        self.saved = types.SimpleNamespace(id=self.me.id, type=ChatType.PRIVATE, title=None)
+        self.parser = FakeParser()
+        self.sent = 0
+        self.calls = 0
+
+    async def _api(self):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def _deliver(self, chat_id):
+        from pyrogram.errors.exceptions import FloodWait
+        from pyrogram.errors.exceptions.not_acceptable_406 import ChannelPrivate
+
+        await self._api()
+        if chat_id == self.me.id:
+            return None
+        if chat_id in self.private:
+            raise ChannelPrivate()
+        if self.flood_rate and self.random.random() < self.flood_rate:
+            raise FloodWait(value=self.flood_wait)
+        self.sent += 1
+        return None
+
+    async def get_dialogs(self, *args, **kwargs):
+        for i, chat in enumerate(self.chats):
+            if i % 100 == 0:
+                await self._api()
+            yield types.SimpleNamespace(chat=chat)
+
+    async def get_messages(self, chat_id, message_ids, *args, **kwargs):
+        await self._api()
+        ids = message_ids if isinstance(message_ids, list) else [message_ids]
+        messages = [FakeMessage(self, self.saved, message_id, "source") for message_id in ids]
+        return messages if isinstance(message_ids, list) else messages[0]
+
+    async def send_message(self, chat_id, text, *args, **kwargs):
+        await self._deliver(chat_id)
+        return FakeMessage(self, self.saved, 1, str(text))
+
+    async def get_chat(self, chat_id):
+        await self._api()
+        return next((chat for chat in self.chats if chat.id == chat_id), self.saved)
+
+
+# ---------------------------------------------------------------------------
+# Skenario
+# ---------------------------------------------------------------------------
+
+def load_plugin():
+    spec = importlib.util.spec_from_file_location("p", os.path.join(HERE, "p.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def bench_autobc(p, client):
+    VARS[(client.me.id, "AUTO_TEXT")] = {
+        "default": [
+            {"type": "text", "content": "<b>promo</b> hari ini"},
+            {"type": "message_ref", "chat_id": client.me.id, "message_id": 10},
+        ]
+    }
+    VARS[(client.me.id, "DELAY_GCAST")] = 1
+    p.AG.append(client.me.id)
+    await p.autobc_task(client)
+    p.AG.remove(client.me.id)
+
+
+async def bench_gcast(p, client):
+    message = FakeMessage(client, client.saved, 1, "gikes group <b>halo</b> semua")
+    await p.gcast_handler(client, message)
+
+
+async def bench_bcfd(p, client):
+    source = FakeMessage(client, client.saved, 10, "source")
+    message = FakeMessage(client, client.saved, 1, "bcfd group", reply_to_message=source)
+    await HANDLERS["bcfd|cfd"](client, message)
+
+
+SCENARIOS = {"autobc": bench_autobc, "gcast": bench_gcast, "bcfd": bench_bcfd}
+
+
+async def run(args):
+    install_pyrogram_stub()
+    install_pyroubot_stub(args.db_latency)
+    p = load_plugin()
+
+    results = []
+    for name in args.scenario or list(SCENARIOS):
+        client = FakeClient(
+            args.chats, args.latency, args.flood_rate, args.flood_wait, args.private_rate, args.seed
+        )
+        VARS[(client.me.id, "SEND_ENGINE")] = {"concurrency": args.concurrency, "rate": args.rate}
+        # Mulai dari keadaan bersih setiap skenario
+        # (sisa write-behind skenario sebelumnya ditulis dulu agar ikut terhapus dari VARS)
+        await p.SETTINGS.flush()
+        p.SEND_ENGINES.pop(client.me.id, None)
+        p.DIALOG_INDEX.pop(client.me.id, None)
+        for key in ("AUTOBC_CHECKPOINT", "DEAD_CHATS", "SLOWMODE_CHATS"):
+            VARS.pop((client.me.id, key), None)
+        p.SETTINGS.invalidate(client.me.id)
+        for tracker in (p.DEAD_CHATS, p.SLOWMODE):
+            tracker._chats.pop(client.me.id, None)
+            tracker._changed.discard(client.me.id)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        await SCENARIOS[name](p, client)
+        wall = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results.append({
+            "scenario": name,
+            "chats": args.chats,
+            "sent": client.sent,
+            "api_calls": client.calls,
+            "parses": client.parser.calls,
+            "wall_s": wall,
+            "sends_per_s": client.sent / wall if wall else 0.0,
+            "peak_mb": peak / (1024 * 1024),
+        })
+    return results
+
+
+def format_results(results):
+    header = (
+        f"{'scenario':<8} {'chats':>7} {'sent':>7} {'api':>7} {'parses':>7} "
+        f"{'wall_s':>9} {'sends/s':>10} {'peak_mb':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['scenario']:<8} {r['chats']:>7} {r['sent']:>7} {r['api_calls']:>7} {r['parses']:>7} "
+            f"{r['wall_s']:>9.2f} {r['sends_per_s']:>10.1f} {r['peak_mb']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS))
+    parser.add_argument("--chats", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0.001, help="latensi API (detik)")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="latensi database (detik)")
+    parser.add_argument("--flood-rate", type=float, default=0.0)
+    parser.add_argument("--flood-wait", type=int, default=1)
+    parser.add_argument("--private-rate", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=100000.0, help="batas laju engine (pesan/detik)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="tulis hasil juga ke file ini")
+    args = parser.parse_args()
+
+    report = format_results(asyncio.run(run(args)))
+    print(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
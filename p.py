@@ -1,14 +1,27 @@
 import asyncio
+import atexit
+import contextvars
+import heapq
+import itertools
+import json
+import os
 import random
+import re
+import secrets
+import time
 import datetime as dt  # Menggunakan alias dt untuk datetime
 
-from gc import get_objects
-from asyncio import sleep
+from collections import OrderedDict
+from copy import deepcopy
+from functools import lru_cache, wraps
+from pyrogram import filters
 from pyrogram.raw.functions.messages import DeleteHistory, StartBot
 from pyrogram.errors.exceptions import *
 from pyrogram.errors.exceptions.not_acceptable_406 import ChannelPrivate
-from pyrogram.enums import ChatType
-from pyrogram.types import InputTextMessageContent, InlineQueryResultArticle
+from pyrogram.enums import ChatType, ParseMode
+from pyrogram.types import (
+    InputTextMessageContent, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, MessageEntity
+)
 from typing import Dict, List, Union, Any  # Import type annotations yang diperlukan
 
 from PyroUbot import *
@@ -44,362 +57,2369 @@ AG = []  # Auto Gcast active user IDs
 LT = []  # Limit check active user IDs
 timer_checker_users = []  # Timer checker active user IDs
 
+# Indeks dialog per client, supaya broadcast tidak perlu get_dialogs() setiap putaran
+DIALOG_INDEX = {}  # user_id -> DialogIndex
+DIALOG_REFRESH_INTERVAL = 6 * 60 * 60  # refresh penuh setiap 6 jam
+DIALOG_HANDLER_GROUP = 97  # group handler khusus untuk update join/leave/migrate
+
+# Pemetaan query get_data_id ke tipe chat di indeks
+DIALOG_QUERY_TYPES = {
+    "global": (ChatType.CHANNEL, ChatType.GROUP, ChatType.SUPERGROUP),
+    "all": (ChatType.GROUP, ChatType.SUPERGROUP, ChatType.PRIVATE),
+    "group": (ChatType.GROUP, ChatType.SUPERGROUP),
+    "users": (ChatType.PRIVATE,),
+}
+
+
+class DialogIndex:
+    """
+    Indeks dialog milik satu client, dikelompokkan berdasarkan tipe chat.
+    Dibangun sekali lewat get_dialogs(), lalu dijaga tetap terbaru dari
+    update join/leave/migrate dan di-refresh penuh secara berkala.
+    """
+
+    def __init__(self):
+        self.chats: Dict[Any, Dict[int, str]] = {}  # tipe chat -> {chat_id: title}
+        self.types: Dict[int, Any] = {}  # chat_id -> tipe chat
+        self.built_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def add(self, chat_id, chat_type, title=None):
+        self.remove(chat_id)
+        self.chats.setdefault(chat_type, {})[chat_id] = title or str(chat_id)
+        self.types[chat_id] = chat_type
+
+    def remove(self, chat_id):
+        chat_type = self.types.pop(chat_id, None)
+        if chat_type is not None:
+            self.chats.get(chat_type, {}).pop(chat_id, None)
+
+    def items(self, *chat_types):
+        """Pasangan (chat_id, title) untuk tipe chat yang diminta"""
+        return [item for t in chat_types for item in self.chats.get(t, {}).items()]
+
+    def ids(self, *chat_types):
+        return [chat_id for t in chat_types for chat_id in self.chats.get(t, {})]
+
+    def is_stale(self):
+        return time.monotonic() - self.built_at > DIALOG_REFRESH_INTERVAL
+
+    async def rebuild(self, client):
+        chats, types = {}, {}
+        async for dialog in client.get_dialogs():
+            chat = dialog.chat
+            chats.setdefault(chat.type, {})[chat.id] = chat.title or chat.first_name or str(chat.id)
+            types[chat.id] = chat.type
+        self.chats, self.types = chats, types
+        self.built_at = time.monotonic()
+
+
+async def get_dialog_index(client, refresh=False):
+    """
+    Ambil indeks dialog client, membangunnya bila belum ada atau sudah kedaluwarsa.
+    """
+    index = DIALOG_INDEX.setdefault(client.me.id, DialogIndex())
+    if refresh or not index.built_at or index.is_stale():
+        async with index.lock:
+            # Cek ulang, mungkin sudah dibangun oleh pemanggil lain selama menunggu lock
+            if refresh or not index.built_at or index.is_stale():
+                await index.rebuild(client)
+    return index
+
+
+async def get_chat_ids(client, query):
+    """Pengganti get_data_id yang membaca dari indeks dialog"""
+    index = await get_dialog_index(client)
+    return index.ids(*DIALOG_QUERY_TYPES.get(query, ()))
+
+
+def discard_dialog(client, chat_id):
+    """Hapus chat dari indeks, misalnya setelah ChannelPrivate"""
+    index = DIALOG_INDEX.get(client.me.id)
+    if index:
+        index.remove(chat_id)
+
+
+# Perbarui indeks dari service message join/leave/migrate
+@ubot.on_message(filters.service, group=DIALOG_HANDLER_GROUP)
+async def _(client, message):
+    index = DIALOG_INDEX.get(client.me.id)
+    if not index or not index.built_at:
+        return
+
+    chat = message.chat
+    if message.migrate_to_chat_id:
+        index.remove(chat.id)
+        index.add(message.migrate_to_chat_id, ChatType.SUPERGROUP, chat.title)
+    elif message.migrate_from_chat_id:
+        index.remove(message.migrate_from_chat_id)
+        index.add(chat.id, chat.type, chat.title)
+    elif message.left_chat_member and message.left_chat_member.id == client.me.id:
+        index.remove(chat.id)
+    elif (
+        message.group_chat_created
+        or message.supergroup_chat_created
+        or message.channel_chat_created
+        or any(user.id == client.me.id for user in (message.new_chat_members or []))
+    ):
+        index.add(chat.id, chat.type, chat.title)
+
+
+# DM baru tidak punya service message, jadi chat pribadi dicatat dari pesan pertamanya
+@ubot.on_message(filters.private & ~filters.service, group=DIALOG_HANDLER_GROUP)
+async def _(client, message):
+    index = DIALOG_INDEX.get(client.me.id)
+    chat = message.chat
+    if not index or not index.built_at or chat.id in index.types:
+        return
+    index.add(chat.id, chat.type, chat.first_name)
+
+SETTINGS_PREFETCH_CONCURRENCY = 20  # query database paralel saat prefetch
+# Key yang ditulis belakangan (write-behind): perubahan beruntun digabung jadi satu tulis
+SETTINGS_WRITE_BEHIND_KEYS = {
+    "AUTO_TEXT", "AUTO_GCAST_ACTIVE", "AUTO_LIMIT_CHECK_ACTIVE", "AUTOBC_FORWARD_MODE", "DEAD_CHATS",
+    "SLOWMODE_CHATS",
+}
+SETTINGS_FLUSH_DELAY = 5  # detik
+
+
+class SettingsCache:
+    """
+    Snapshot pengaturan (vars) per user di memori.
+    Dibaca dari database sekali (read-through), lalu setiap perubahan lewat
+    set()/add_to_list()/remove_from_list() ditulis ke database dan ke snapshot
+    sekaligus (write-through), sehingga loop autobc/timer tidak perlu query ulang.
+
+    set() dengan nilai yang sama seperti snapshot tidak menulis apa pun. Key di
+    SETTINGS_WRITE_BEHIND_KEYS hanya ditandai dirty dan ditulis oleh flush()
+    paling lambat SETTINGS_FLUSH_DELAY detik kemudian, serta saat shutdown.
+    """
+
+    def __init__(self):
+        self._values = {}  # user_id -> {key: value}
+        self._lists = {}  # user_id -> {key: [int]}
+        self._dirty = set()  # (user_id, key) yang belum ditulis ke database
+        self._loop = None
+        self._guard = None
+
+    async def get(self, user_id, key):
+        values = self._values.setdefault(user_id, {})
+        if key not in values:
+            values[key] = await get_vars(user_id, key)
+        # Salinan supaya mutasi oleh pemanggil tidak mengubah snapshot sebelum disimpan
+        return deepcopy(values[key])
+
+    async def prefetch(self, user_ids, keys, concurrency=SETTINGS_PREFETCH_CONCURRENCY):
+        """
+        Baca banyak key untuk banyak user sekaligus secara paralel dan simpan ke snapshot.
+        Key yang sudah ada di snapshot dilewati. Mengembalikan jumlah key yang dibaca.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        missing = [
+            (user_id, key)
+            for user_id in user_ids
+            for key in keys
+            if key not in self._values.get(user_id, {})
+        ]
+
+        async def load(user_id, key):
+            async with semaphore:
+                value = await get_vars(user_id, key)
+            self._values.setdefault(user_id, {})[key] = value
+
+        await asyncio.gather(*(load(user_id, key) for user_id, key in missing))
+        return len(missing)
+
+    async def get_list(self, user_id, key):
+        lists = self._lists.setdefault(user_id, {})
+        if key not in lists:
+            lists[key] = await get_list_from_vars(user_id, key)
+        return list(lists[key])
+
+    async def set(self, user_id, key, value):
+        values = self._values.setdefault(user_id, {})
+        if key in values and values[key] == value:
+            return
+        if key in SETTINGS_WRITE_BEHIND_KEYS:
+            self._mark_dirty(user_id, key)
+        else:
+            await set_vars(user_id, key, value)
+        values[key] = deepcopy(value)
+        self._lists.get(user_id, {}).pop(key, None)
+
+    def _mark_dirty(self, user_id, key):
+        self._dirty.add((user_id, key))
+        self._loop = asyncio.get_running_loop()
+        if not SCHEDULER.has(("settings", "flush")):
+            SCHEDULER.schedule(("settings", "flush"), self.flush, SETTINGS_FLUSH_DELAY)
+
+    def pending(self):
+        return len(self._dirty)
+
+    async def flush(self, concurrency=SETTINGS_PREFETCH_CONCURRENCY):
+        """
+        Tulis semua key dirty dengan nilai terakhirnya. Key yang gagal ditulis
+        tetap dirty. Sebagai job scheduler, dijadwalkan ulang bila masih ada sisa.
+        """
+        # Nilai diambil saat pertukaran: selama penulisan key ini tidak lagi dirty,
+        # jadi invalidate() boleh membuangnya dari snapshot
+        pending = {(u, k): self._values[u][k] for u, k in self._dirty}
+        self._dirty = set()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def write(user_id, key, value):
+            try:
+                async with semaphore:
+                    await set_vars(user_id, key, value)
+            except Exception as e:
+                print(f"Error flushing {key} for {user_id}: {e}")
+                # Nilai yang lebih baru dari set() selama penulisan tetap dipakai
+                self._values.setdefault(user_id, {}).setdefault(key, value)
+                self._dirty.add((user_id, key))
+
+        await asyncio.gather(*(write(user_id, key, value) for (user_id, key), value in pending.items()))
+        return SETTINGS_FLUSH_DELAY if self._dirty else None
+
+    def watch_shutdown(self):
+        """Task penjaga yang menulis sisa perubahan saat dibatalkan ketika bot berhenti"""
+        async def guard():
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await self.flush()
+
+        if self._guard is None or self._guard.done():
+            self._loop = asyncio.get_running_loop()
+            self._guard = create_background_task(guard())
+
+    def flush_at_exit(self):
+        # Cadangan bila loop berhenti tanpa membatalkan task penjaga
+        loop = self._loop
+        if self._dirty and loop and not loop.is_closed() and not loop.is_running():
+            loop.run_until_complete(self.flush())
+
+    async def add_to_list(self, user_id, key, value):
+        await add_to_vars(user_id, key, value)
+        self.invalidate(user_id, key)
+
+    async def remove_from_list(self, user_id, key, value):
+        await remove_from_vars(user_id, key, value)
+        self.invalidate(user_id, key)
+
+    async def add_many_to_list(self, user_id, key, values):
+        """Tambah banyak nilai dalam satu kali tulis. Mengembalikan jumlah nilai yang baru"""
+        current = await self.get_list(user_id, key)
+        existing = set(current)
+        new = [value for value in dict.fromkeys(values) if value not in existing]
+        if new:
+            await self._write_list(user_id, key, current + new)
+        return len(new)
+
+    async def remove_many_from_list(self, user_id, key, values):
+        """Hapus banyak nilai dalam satu kali tulis. Mengembalikan jumlah nilai yang terhapus"""
+        current = await self.get_list(user_id, key)
+        drop = set(values)
+        kept = [value for value in current if value not in drop]
+        if len(kept) != len(current):
+            await self._write_list(user_id, key, kept)
+        return len(current) - len(kept)
+
+    async def clear_list(self, user_id, key):
+        await self._write_list(user_id, key, [])
+
+    async def _write_list(self, user_id, key, values):
+        # Format sama dengan add_to_vars/remove_from_vars: id dipisah spasi
+        await set_vars(user_id, key, " ".join(map(str, values)))
+        self._values.get(user_id, {}).pop(key, None)
+        self._lists.setdefault(user_id, {})[key] = list(values)
+
+    def invalidate(self, user_id, key=None):
+        """
+        Buang snapshot satu key, atau semua key milik user bila key=None.
+        Key dirty dipertahankan karena nilai terbarunya belum ada di database.
+        """
+        values = self._values.get(user_id, {})
+        if key is None:
+            self._values[user_id] = {k: v for k, v in values.items() if (user_id, k) in self._dirty}
+            self._lists.pop(user_id, None)
+        else:
+            if (user_id, key) not in self._dirty:
+                values.pop(key, None)
+            self._lists.get(user_id, {}).pop(key, None)
+
+
+SETTINGS = SettingsCache()
+atexit.register(SETTINGS.flush_at_exit)
+
+
+async def get_blacklist(client):
+    """
+    Blacklist gabungan (BL_ID milik user + BLACKLIST_CHAT global) dalam bentuk set.
+    Dibangun sekali di awal setiap broadcast, cek keanggotaan O(1).
+    """
+    return frozenset(await SETTINGS.get_list(client.me.id, "BL_ID")).union(BLACKLIST_CHAT)
+
+
+def parse_chat_ids(args):
+    """Ubah argumen perintah menjadi daftar chat_id, argumen yang bukan angka diabaikan"""
+    chat_ids = []
+    for arg in args:
+        for part in arg.replace(",", " ").split():
+            try:
+                chat_ids.append(int(part))
+            except ValueError:
+                pass
+    return chat_ids
+
+# Emoji yang dipakai di modul ini, di-resolve sekali per client
+EMOJI_NAMES = (
+    "PROSES", "BERHASIL", "GAGAL", "BROADCAST", "MENUNGGU",
+    "BL_GROUP", "BL_KETERANGAN", "PING", "MENTION", "UBOT",
+)
+EMOJI_CACHE = {}  # user_id -> EmojiSet
+
+
+class EmojiSet:
+    """
+    Hasil EMO.* yang sudah di-resolve untuk satu client.
+    Atribut memakai nama yang sama dengan EMO, contoh: emo.BERHASIL
+    """
+
+    def __init__(self, values, is_premium):
+        self.__dict__.update(values)
+        self.is_premium = is_premium
+
+
+async def get_emo(client):
+    """
+    Ambil set emoji milik client dari cache, resolve semua EMO.* sekaligus bila belum ada.
+    Cache otomatis dibuang bila status premium berubah.
+    """
+    emo = EMOJI_CACHE.get(client.me.id)
+    if emo is None or emo.is_premium != client.me.is_premium:
+        values = await asyncio.gather(*(getattr(EMO, name)(client) for name in EMOJI_NAMES))
+        emo = EmojiSet(dict(zip(EMOJI_NAMES, values)), client.me.is_premium)
+        EMOJI_CACHE[client.me.id] = emo
+    return emo
+
+
+def invalidate_emo(user_id):
+    """Panggil setelah user mengubah pengaturan emoji"""
+    EMOJI_CACHE.pop(user_id, None)
+
+
+# Cache pesan sumber message_ref autobc, dipakai lintas putaran
+MESSAGE_REF_TTL = 30 * 60  # detik
+MESSAGE_REF_MAX = 1024  # jumlah pesan maksimal di cache
+MESSAGE_REF_BATCH = 200  # batas id per panggilan get_messages
+
+
+class MessageRefCache:
+    """
+    Cache TTL/LRU untuk objek pesan yang dirujuk oleh entri message_ref.
+    Key: (user_id, chat_id, message_id).
+    """
+
+    def __init__(self, ttl=MESSAGE_REF_TTL, maxsize=MESSAGE_REF_MAX):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (expires_at, message)
+
+    def get(self, key):
+        item = self._data.get(key)
+        if not item:
+            return None
+        expires_at, message = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return message
+
+    def put(self, key, message):
+        self._data[key] = (time.monotonic() + self.ttl, message)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def discard(self, key):
+        self._data.pop(key, None)
+
+
+MESSAGE_REF_CACHE = MessageRefCache()
+
+
+def message_ref_key(msg_data):
+    """Key (chat_id, message_id) untuk entri message_ref, None untuk tipe lain"""
+    if isinstance(msg_data, dict) and msg_data.get("type") == "message_ref":
+        return (msg_data.get("chat_id"), msg_data.get("message_id"))
+    return None
+
+
+async def resolve_message_refs(client, auto_messages):
+    """
+    Ambil semua pesan message_ref yang berbeda di auto_messages.
+
+    Pesan yang belum ada di cache diambil dengan satu get_messages per chat sumber.
+
+    Returns:
+        (resolved, missing): resolved = {(chat_id, message_id): Message},
+        missing = set (chat_id, message_id) yang menurut hasil get_messages sudah tidak ada.
+        Ref yang batch-nya gagal diambil (FloodWait, error lain) tidak masuk ke keduanya.
+    """
+    refs = {
+        key
+        for entries in auto_messages.values()
+        for key in map(message_ref_key, entries or [])
+        if key
+    }
+    resolved, missing = {}, set()
+    pending = {}  # chat_id -> [message_id]
+
+    for ref in refs:
+        cached = MESSAGE_REF_CACHE.get((client.me.id, *ref))
+        if cached:
+            resolved[ref] = cached
+        else:
+            pending.setdefault(ref[0], []).append(ref[1])
+
+    for ref_chat_id, message_ids in pending.items():
+        for i in range(0, len(message_ids), MESSAGE_REF_BATCH):
+            batch = message_ids[i:i + MESSAGE_REF_BATCH]
+            try:
+                messages = await client.get_messages(ref_chat_id, batch)
+            except Exception as e:
+                # FloodWait, timeout, PeerIdInvalid setelah restart, dll. belum tentu
+                # berarti pesannya hilang: coba lagi di putaran berikutnya, jangan dihapus
+                print(f"Error fetching message refs from {ref_chat_id}: {e}")
+                continue
+
+            if not isinstance(messages, list):
+                messages = [messages]
+            for message_id, source_msg in zip(batch, messages):
+                ref = (ref_chat_id, message_id)
+                if not source_msg or getattr(source_msg, "empty", False):
+                    missing.add(ref)
+                    MESSAGE_REF_CACHE.discard((client.me.id, *ref))
+                else:
+                    resolved[ref] = source_msg
+                    MESSAGE_REF_CACHE.put((client.me.id, *ref), source_msg)
+
+    return resolved, missing
+
+
+def prune_missing_refs(auto_messages, missing):
+    """Hapus entri message_ref yang pesannya sudah hilang. Mengembalikan True bila ada perubahan"""
+    if not missing:
+        return False
+    changed = False
+    for key, entries in auto_messages.items():
+        kept = [m for m in entries or [] if message_ref_key(m) not in missing]
+        if len(kept) != len(entries or []):
+            auto_messages[key] = kept
+            changed = True
+    return changed
+
+
+# Hasil parse HTML/markdown teks broadcast, supaya tidak di-parse ulang untuk setiap grup
+PARSED_TEXT_MAX = 256  # jumlah teks maksimal di cache
+
+
+class ParsedTextCache:
+    """
+    Cache LRU (user_id, teks) -> (teks polos, entities) dari client.parser.
+    Teks dengan mention ke user (tg://user?id=) tidak di-cache karena entity-nya
+    harus di-resolve ulang oleh Pyrogram; pemanggil memakai send_message biasa.
+    """
+
+    def __init__(self, max_size=PARSED_TEXT_MAX):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, client, text):
+        key = (client.me.id, text)
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+        self.misses += 1
+        parsed = await client.parser.parse(text, None)
+        raw_entities = parsed["entities"] or []
+        if any(type(entity).__name__.startswith("Input") for entity in raw_entities):
+            value = None
+        else:
+            entities = [MessageEntity._parse(client, entity, {}) for entity in raw_entities]
+            value = (parsed["message"], [entity for entity in entities if entity])
+        self._items[key] = value
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+        return value
+
+
+PARSED_TEXT = ParsedTextCache()
+
+
+async def send_parsed_text(client, chat_id, text):
+    """send_message dengan hasil parse yang di-cache, teks yang sama hanya di-parse sekali"""
+    try:
+        parsed = await PARSED_TEXT.get(client, text)
+    except Exception:
+        parsed = None
+    if parsed is None:
+        return await client.send_message(chat_id, text)
+    message, entities = parsed
+    if not entities:
+        # Tanpa entities Pyrogram akan mem-parse ulang, jadi matikan parse_mode
+        return await client.send_message(chat_id, message, parse_mode=ParseMode.DISABLED)
+    return await client.send_message(chat_id, message, entities=entities)
+
+
+# Registry pesan untuk inline get_send
+SEND_REGISTRY_TTL = 5 * 60  # detik
+SEND_REGISTRY_MAX = 256
+
+
+class SendRegistry:
+    """
+    Menyimpan pesan yang akan dikirim lewat inline get_send, dicari dengan token acak.
+    Ukurannya dibatasi dan entri lama dibuang setelah TTL habis.
+    """
+
+    def __init__(self, ttl=SEND_REGISTRY_TTL, maxsize=SEND_REGISTRY_MAX):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # token -> (expires_at, message)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def register(self, message):
+        self._purge()
+        token = secrets.token_urlsafe(12)
+        self._data[token] = (time.monotonic() + self.ttl, message)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evicted += 1
+        return token
+
+    def get(self, token):
+        item = self._data.get(token)
+        if not item:
+            self.misses += 1
+            return None
+        expires_at, message = item
+        if expires_at < time.monotonic():
+            del self._data[token]
+            self.expired += 1
+            return None
+        self.hits += 1
+        return message
+
+    def _purge(self):
+        # Entri disimpan berurutan dengan TTL yang sama, jadi yang kedaluwarsa selalu di depan
+        now = time.monotonic()
+        while self._data:
+            token, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at >= now:
+                break
+            del self._data[token]
+            self.expired += 1
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+SEND_REGISTRY = SendRegistry()
+# Atribut tombol yang ikut dikirim saat pesan get_send diambil dari shard lain
+SEND_BUTTON_FIELDS = (
+    "text", "callback_data", "url", "user_id", "switch_inline_query", "switch_inline_query_current_chat"
+)
+
+
+def send_payload(message):
+    """Teks dan tombol pesan yang di-reply perintah send, dalam bentuk JSON"""
+    reply = message.reply_to_message
+    keyboard = []
+    for row in getattr(reply.reply_markup, "inline_keyboard", None) or []:
+        buttons = []
+        for button in row:
+            fields = {name: getattr(button, name, None) for name in SEND_BUTTON_FIELDS}
+            if isinstance(fields["callback_data"], bytes):
+                fields["callback_data"] = fields["callback_data"].decode(errors="replace")
+            buttons.append({name: value for name, value in fields.items() if value is not None})
+        keyboard.append(buttons)
+    return {"text": reply.text, "keyboard": keyboard}
+
+
+async def lookup_send(user_id, token):
+    """
+    Cari pesan get_send milik user_id -> (teks, reply_markup) atau None.
+    Inline selalu masuk ke shard 0, sedangkan pesan didaftarkan oleh perintah
+    send di shard tempat akun berjalan. Registry lokal dicek dulu (akun yang
+    ditambahkan saat berjalan tetap di shard 0 sampai restart); bila tidak ada,
+    pesan diminta ke shard pemilik akun lewat port kontrol.
+    """
+    message = SEND_REGISTRY.get(token)
+    if message:
+        return message.reply_to_message.text, message.reply_to_message.reply_markup
+    owner = shard_of(user_id)
+    if owner == SHARD_INDEX or not SHARD_PORT_BASE:
+        return None
+    response = await shard_request(owner, {"cmd": "get_send", "token": token})
+    payload = (response or {}).get("payload")
+    if not payload:
+        return None
+    keyboard = [[InlineKeyboardButton(**button) for button in row] for row in payload["keyboard"]]
+    return payload["text"], InlineKeyboardMarkup(keyboard) if keyboard else None
+
+# Metrik broadcast, diekspor dalam format teks Prometheus
+# Dengan sharding, shard i memakai port + i dan file berakhiran .shard<i>
+METRICS_FILE = os.getenv("BROADCAST_METRICS_FILE")  # tulis berkala ke file ini bila diisi
+METRICS_PORT = os.getenv("BROADCAST_METRICS_PORT")  # endpoint HTTP lokal bila diisi
+METRICS_FILE_INTERVAL = 60  # detik
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+ROUND_BUCKETS = (10, 30, 60, 300, 600, 1800, 3600, 7200)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class MetricsRegistry:
+    """
+    Counter dan histogram per akun untuk gikes, bcfd, bcast, autobc dan cek limit.
+    Label disimpan sebagai tuple (nama, nilai) yang sudah diurutkan.
+    """
+
+    def __init__(self):
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+
+    @staticmethod
+    def _labels(labels):
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = (name, self._labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets, **labels):
+        key = (name, self._labels(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def render(self):
+        """Semua metrik dalam format teks Prometheus"""
+        def fmt(labels, extra=()):
+            pairs = [f'{key}="{value}"' for key, value in (*labels, *extra)]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        lines = []
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(self.counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{fmt(labels)} {value}")
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{fmt(labels, (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{fmt(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{fmt(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def account_summary(self, user_id):
+        """Ringkasan metrik satu akun, dikelompokkan per jalur broadcast"""
+        account = str(user_id)
+        summary = {}
+        for (name, labels), value in self.counters.items():
+            labels = dict(labels)
+            if labels.get("account") != account:
+                continue
+            entry = summary.setdefault(labels.get("path", "-"), {"errors": {}})
+            if name == "broadcast_failed_total":
+                entry["errors"][labels.get("error")] = value
+            entry[name] = entry.get(name, 0) + value
+        for (name, labels), histogram in self.histograms.items():
+            labels = dict(labels)
+            if labels.get("account") != account or not histogram.count:
+                continue
+            entry = summary.setdefault(labels.get("path", "-"), {"errors": {}})
+            entry[name] = histogram.sum / histogram.count
+        return summary
+
+
+METRICS = MetricsRegistry()
+
+
+def filter_blacklisted(client, chat_ids, blacklist, path):
+    """Buang chat yang ada di blacklist dan catat jumlahnya ke metrik"""
+    targets = [chat_id for chat_id in chat_ids if chat_id not in blacklist]
+    skipped = len(chat_ids) - len(targets)
+    if skipped:
+        METRICS.inc("broadcast_skipped_blacklist_total", skipped, account=client.me.id, path=path)
+    return targets
+
+
+# Chat yang terus gagal (dikeluarkan, dibisukan, dibatasi) dilewati dengan backoff eksponensial
+DEAD_CHAT_ERRORS = {
+    "ChannelPrivate", "ChannelInvalid", "ChatWriteForbidden", "ChatRestricted",
+    "ChatAdminRequired", "UserBannedInChannel", "PeerIdInvalid", "UserIsBlocked",
+    "ChatSendPlainForbidden", "ChatSendMediaForbidden", "ChatGuestSendForbidden",
+}
+DEAD_CHAT_BACKOFF = 60 * 60  # jeda setelah gagal pertama, lalu dilipatgandakan
+DEAD_CHAT_BACKOFF_MAX = 7 * 24 * 60 * 60
+
+
+class DeadChatTracker:
+    """
+    Indeks kegagalan per akun, disimpan di vars DEAD_CHATS:
+    {"chat_id": {"NamaError": {"failures": n, "until": unix time}}}
+    Chat dilewati selama salah satu error-nya masih dalam masa backoff.
+    Pengiriman yang berhasil menghapus chat dari indeks.
+    """
+
+    def __init__(self):
+        self._chats = {}  # user_id -> dict seperti di atas
+        self._changed = set()  # user_id yang indeksnya berubah sejak save()
+
+    async def _load(self, user_id):
+        chats = self._chats.get(user_id)
+        if chats is None:
+            chats = self._chats[user_id] = await SETTINGS.get(user_id, "DEAD_CHATS") or {}
+        return chats
+
+    @staticmethod
+    def blocked_until(entry):
+        return max((error["until"] for error in entry.values()), default=0)
+
+    async def filter(self, client, chat_ids, path):
+        """Buang chat yang masih dalam backoff dan catat jumlahnya ke metrik"""
+        chats = await self._load(client.me.id)
+        if not chats:
+            return list(chat_ids)
+        now = time.time()
+        targets = [
+            chat_id for chat_id in chat_ids
+            if str(chat_id) not in chats or self.blocked_until(chats[str(chat_id)]) <= now
+        ]
+        skipped = len(chat_ids) - len(targets)
+        if skipped:
+            METRICS.inc("broadcast_skipped_dead_total", skipped, account=client.me.id, path=path)
+        return targets
+
+    def record_failure(self, user_id, chat_id, error):
+        name = type(error).__name__
+        chats = self._chats.get(user_id)
+        if name not in DEAD_CHAT_ERRORS or chats is None:
+            return
+        entry = chats.setdefault(str(chat_id), {}).setdefault(name, {"failures": 0, "until": 0})
+        entry["failures"] += 1
+        backoff = DEAD_CHAT_BACKOFF * 2 ** min(entry["failures"] - 1, 16)
+        entry["until"] = time.time() + min(backoff, DEAD_CHAT_BACKOFF_MAX)
+        self._changed.add(user_id)
+
+    def record_success(self, user_id, chat_id):
+        chats = self._chats.get(user_id)
+        if chats and chats.pop(str(chat_id), None) is not None:
+            self._changed.add(user_id)
+
+    async def save(self, user_id):
+        if user_id in self._changed:
+            self._changed.discard(user_id)
+            await SETTINGS.set(user_id, "DEAD_CHATS", self._chats[user_id])
+
+    async def items(self, user_id):
+        """(chat_id, entry) diurutkan dari backoff terlama"""
+        chats = await self._load(user_id)
+        return sorted(chats.items(), key=lambda item: -self.blocked_until(item[1]))
+
+    async def reset(self, user_id, chat_id=None):
+        """Hapus satu chat atau seluruh indeks. Mengembalikan jumlah chat yang dihapus"""
+        chats = await self._load(user_id)
+        if chat_id is None:
+            removed = len(chats)
+            chats.clear()
+        else:
+            removed = 1 if chats.pop(str(chat_id), None) is not None else 0
+        if removed:
+            self._changed.add(user_id)
+            await self.save(user_id)
+        return removed
+
+
+DEAD_CHATS = DeadChatTracker()
+
+
+# Slow mode per grup: pengiriman ke grup ditunda sampai jendelanya lewat
+SLOWMODE_MAX_WAIT = 5 * 60  # grup yang harus ditunggu lebih lama dilewati di broadcast ini
+
+
+class SlowModeTracker:
+    """
+    Interval slow mode dan waktu kirim terakhir per grup, disimpan di vars SLOWMODE_CHATS:
+    {"chat_id": {"interval": detik, "last": unix time kirim terakhir}}
+    Interval dipelajari dari SlowmodeWait, hanya grup yang pernah terkena yang dicatat.
+    """
+
+    def __init__(self):
+        self._chats = {}  # user_id -> dict seperti di atas
+        self._changed = set()
+
+    async def load(self, user_id):
+        chats = self._chats.get(user_id)
+        if chats is None:
+            chats = self._chats[user_id] = await SETTINGS.get(user_id, "SLOWMODE_CHATS") or {}
+        return chats
+
+    def ready_in(self, user_id, chat_id):
+        """Detik sampai grup boleh dikirimi lagi, 0 bila sudah boleh"""
+        entry = self._chats.get(user_id, {}).get(str(chat_id))
+        if not entry:
+            return 0
+        return max(0.0, entry["last"] + entry["interval"] - time.time())
+
+    def record_wait(self, user_id, chat_id, wait):
+        chats = self._chats.setdefault(user_id, {})
+        entry = chats.setdefault(str(chat_id), {"interval": 0, "last": 0})
+        entry["interval"] = max(entry["interval"], wait)
+        # Sisa tunggu = interval - (sekarang - kirim terakhir)
+        entry["last"] = time.time() + wait - entry["interval"]
+        self._changed.add(user_id)
+
+    def record_success(self, user_id, chat_id):
+        entry = self._chats.get(user_id, {}).get(str(chat_id))
+        if entry:
+            entry["last"] = time.time()
+            self._changed.add(user_id)
+
+    async def save(self, user_id):
+        if user_id in self._changed:
+            self._changed.discard(user_id)
+            await SETTINGS.set(user_id, "SLOWMODE_CHATS", self._chats[user_id])
+
+
+SLOWMODE = SlowModeTracker()
+
+
+def metrics_file_path():
+    """METRICS_FILE milik worker ini, agar shard tidak saling menimpa file yang sama"""
+    if SHARD_COUNT == 1:
+        return METRICS_FILE
+    root, ext = os.path.splitext(METRICS_FILE)
+    return f"{root}.shard{SHARD_INDEX}{ext}"
+
+
+async def write_metrics_file():
+    """Job scheduler yang menulis metrik ke METRICS_FILE secara berkala"""
+    try:
+        with open(metrics_file_path(), "w") as file:
+            file.write(METRICS.render())
+    except Exception as e:
+        print(f"Error writing metrics file: {e}")
+    return METRICS_FILE_INTERVAL
+
+
+async def serve_metrics(reader, writer):
+    try:
+        await reader.readline()
+        body = METRICS.render().encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/plain; version=0.0.4\r\n"
+            + f"Content-Length: {len(body)}\r\n".encode()
+            + b"Connection: close\r\n\r\n"
+            + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def start_metrics_export():
+    """Aktifkan ekspor metrik sesuai BROADCAST_METRICS_FILE/BROADCAST_METRICS_PORT"""
+    if METRICS_FILE:
+        SCHEDULER.schedule(("metrics", "file"), write_metrics_file, METRICS_FILE_INTERVAL)
+    if METRICS_PORT:
+        try:
+            await asyncio.start_server(serve_metrics, "127.0.0.1", int(METRICS_PORT) + SHARD_INDEX)
+        except Exception as e:
+            print(f"Error starting metrics endpoint: {e}")
+
+
+# Profil latensi handler (opt-in): HANDLER_PROFILE=1 atau "autobc profile on"
+HANDLER_PROFILE = os.getenv("HANDLER_PROFILE", "").lower() in ("1", "true", "on")
+PROFILE_SLOWEST = 10  # pemanggilan paling lambat yang disimpan per perintah
+PROFILE_CURRENT = contextvars.ContextVar("profile_current", default=None)
+
+
+def create_background_task(coro):
+    """
+    create_task dengan context kosong, untuk task berumur panjang yang bisa saja
+    pertama kali dibuat dari dalam handler yang sedang diprofil
+    """
+    return contextvars.Context().run(asyncio.create_task, coro)
+
+
+class HandlerProfile:
+    """Satu pemanggilan handler: waktu total dan waktu menunggu Telegram/database"""
+
+    __slots__ = ("command", "user_id", "started", "wall", "telegram", "db", "recorded")
+
+    def __init__(self, command, user_id):
+        self.command = command
+        self.user_id = user_id
+        self.started = time.time()
+        self.wall = 0.0
+        self.telegram = 0.0
+        self.db = 0.0
+        self.recorded = False
+
+
+class HandlerProfiler:
+    """
+    Mencatat durasi handler PY.UBOT/PY.BOT/PY.INLINE per perintah.
+    Waktu Telegram diukur di Client.invoke, waktu database di fungsi vars.
+    Task yang dibuat handler (mis. pengiriman paralel) ikut dihitung, sehingga
+    waktu Telegram bisa lebih besar dari waktu total.
+    """
+
+    def __init__(self, enabled=False, slowest=PROFILE_SLOWEST):
+        self.enabled = False
+        self.slowest = slowest
+        self.stats = {}  # command -> dict
+        self._counter = itertools.count()
+        self._invoke_patched = False
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        self.enabled = True
+        self._patch_invoke()
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.stats.clear()
+
+    def _patch_invoke(self):
+        if self._invoke_patched:
+            return
+        try:
+            from pyrogram import Client
+        except ImportError:
+            return
+        original = Client.invoke
+
+        @wraps(original)
+        async def invoke(client, *args, **kwargs):
+            profile = PROFILE_CURRENT.get()
+            if profile is None or profile.recorded:
+                return await original(client, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return await original(client, *args, **kwargs)
+            finally:
+                profile.telegram += time.perf_counter() - started
+
+        Client.invoke = invoke
+        self._invoke_patched = True
+
+    def track(self, name, subcommand=False):
+        """Decorator handler; subcommand=True memisahkan "autobc list", "autobc on", dst."""
+        def decorator(func):
+            @wraps(func)
+            async def wrapper(client, update, *args, **kwargs):
+                if not self.enabled:
+                    return await func(client, update, *args, **kwargs)
+                command = name
+                if subcommand:
+                    parts = (getattr(update, "text", None) or "").split()
+                    if len(parts) > 1:
+                        command = f"{name} {parts[1].split(':', 1)[0].lower()}"
+                profile = HandlerProfile(command, getattr(client.me, "id", None))
+                token = PROFILE_CURRENT.set(profile)
+                started = time.perf_counter()
+                try:
+                    return await func(client, update, *args, **kwargs)
+                finally:
+                    profile.wall = time.perf_counter() - started
+                    PROFILE_CURRENT.reset(token)
+                    self.record(profile)
+            return wrapper
+        return decorator
+
+    def record(self, profile):
+        # Task yang masih hidup setelah handler selesai tidak lagi menambah waktu profil ini
+        profile.recorded = True
+        entry = self.stats.get(profile.command)
+        if entry is None:
+            entry = self.stats[profile.command] = {
+                "count": 0, "wall": 0.0, "telegram": 0.0, "db": 0.0, "max": 0.0, "slowest": []
+            }
+        entry["count"] += 1
+        entry["wall"] += profile.wall
+        entry["telegram"] += profile.telegram
+        entry["db"] += profile.db
+        entry["max"] = max(entry["max"], profile.wall)
+        item = (profile.wall, next(self._counter), profile)
+        if len(entry["slowest"]) < self.slowest:
+            heapq.heappush(entry["slowest"], item)
+        elif item[0] > entry["slowest"][0][0]:
+            heapq.heapreplace(entry["slowest"], item)
+
+    def summary(self):
+        """Perintah diurutkan dari total waktu terbesar"""
+        return sorted(self.stats.items(), key=lambda item: -item[1]["wall"])
+
+    def slowest_calls(self, command=None):
+        if command is not None:
+            entries = [self.stats[command]] if command in self.stats else []
+        else:
+            entries = self.stats.values()
+        calls = [profile for entry in entries for _, _, profile in entry["slowest"]]
+        return sorted(calls, key=lambda profile: -profile.wall)[:self.slowest]
+
+
+PROFILER = HandlerProfiler(HANDLER_PROFILE)
+
+
+def profile_db(func):
+    """Bungkus fungsi vars agar waktunya masuk ke profil handler yang sedang berjalan"""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        profile = PROFILE_CURRENT.get()
+        if profile is None or profile.recorded:
+            return await func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            profile.db += time.perf_counter() - started
+    return wrapper
+
+
+get_vars = profile_db(get_vars)
+set_vars = profile_db(set_vars)
+get_list_from_vars = profile_db(get_list_from_vars)
+add_to_vars = profile_db(add_to_vars)
+remove_from_vars = profile_db(remove_from_vars)
+
+
+# Pengaturan default engine pengiriman, bisa diubah per akun lewat "autobc engine"
+SEND_CONCURRENCY = 3  # pengiriman yang berjalan bersamaan
+SEND_RATE = 2.0  # pesan per detik
+SEND_ENGINES = {}  # user_id -> SendEngine
+
+
+class SendEngine:
+    """
+    Engine pengiriman per client yang dipakai bersama oleh gikes, bcfd, bcast dan autobc.
+    Konkurensi dibatasi semaphore dan laju dibatasi token bucket, sehingga broadcast
+    yang berjalan bersamaan berbagi jatah laju akun yang sama. FloodWait menahan
+    seluruh bucket sampai waktu tunggunya habis.
+    """
+
+    def __init__(self, concurrency=SEND_CONCURRENCY, rate=SEND_RATE):
+        self.configure(concurrency, rate)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def configure(self, concurrency, rate):
+        self.concurrency = max(1, int(concurrency))
+        self.rate = max(0.01, float(rate))
+        self.burst = self.concurrency
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+
+    def pause(self, seconds):
+        """Tahan semua pengiriman selama seconds detik (dipakai saat FloodWait)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def _acquire_token(self):
+        # Lock asyncio bersifat FIFO, jadi antrean token adil antar jalur broadcast
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    async def submit(self, send, *args):
+        """
+        Jalankan satu pengiriman sesuai batas konkurensi dan laju.
+        FloodWait menahan engine lalu diteruskan ke pemanggil.
+        """
+        async with self.semaphore:
+            await self._acquire_token()
+            try:
+                return await send(*args)
+            except FloodWait as e:
+                self.pause(e.value)
+                raise
+
+
+async def get_send_engine(client):
+    engine = SEND_ENGINES.get(client.me.id)
+    if engine is None:
+        config = await SETTINGS.get(client.me.id, "SEND_ENGINE") or {}
+        engine = SendEngine(
+            config.get("concurrency", SEND_CONCURRENCY),
+            config.get("rate", SEND_RATE),
+        )
+        SEND_ENGINES[client.me.id] = engine
+    return engine
+
+
+BROADCAST_MAX_ATTEMPTS = 3  # percobaan maksimal per chat saat terkena FloodWait
+
+
+class BroadcastResult:
+    """Rekap hasil satu broadcast"""
+
+    def __init__(self):
+        self.done = 0
+        self.failed = 0
+        self.deferred = 0  # chat yang dipindah ke antrean retry
+        self.retried = 0  # percobaan ulang dari antrean retry
+        self.abandoned = 0  # chat yang dilepas setelah BROADCAST_MAX_ATTEMPTS
+        self.postponed = 0  # pengiriman yang ditunda karena slow mode
+        self.skipped_slowmode = 0  # grup yang dilewati karena slow mode terlalu lama
+        self.stopped = False
+
+    def merge(self, other):
+        """Tambahkan hasil broadcast lain (mis. halaman berikutnya) ke rekap ini"""
+        for name in ("done", "failed", "deferred", "retried", "abandoned", "postponed", "skipped_slowmode"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.stopped = self.stopped or other.stopped
+
+    def retry_summary(self):
+        """Ringkasan antrean retry, kosong bila tidak ada chat yang ditunda"""
+        if not self.deferred:
+            return ""
+        return (
+            f"ditunda {self.deferred}, dicoba ulang {self.retried}, "
+            f"dilepas {self.abandoned}"
+        )
+
+    def slowmode_summary(self):
+        """Ringkasan grup slow mode, kosong bila tidak ada"""
+        if not (self.postponed or self.skipped_slowmode):
+            return ""
+        return f"ditunda {self.postponed}, dilewati {self.skipped_slowmode}"
+
+
+def retry_report(result):
+    """Baris laporan antrean retry untuk balasan HTML, kosong bila tidak ada"""
+    summary = result.retry_summary()
+    report = f"<blockquote><b>FloodWait: {summary}</b></blockquote>" if summary else ""
+    slowmode = result.slowmode_summary()
+    if slowmode:
+        report += f"<blockquote><b>Slow mode: {slowmode}</b></blockquote>"
+    return report
+
+
+async def run_broadcast(client, targets, send, path, stop=None, on_progress=None, track_dead=False):
+    """
+    Kirim ke semua target lewat engine pengiriman milik client.
+
+    Chat yang terkena FloodWait tidak ditunggu di tempat, melainkan dipindah ke
+    antrean retry berurutan deadline dan dicoba lagi setelah waktunya tiba,
+    paling banyak BROADCAST_MAX_ATTEMPTS kali. Target lain tetap diproses.
+    Grup dengan slow mode yang jendelanya belum lewat juga masuk antrean itu
+    (atau dilewati bila harus menunggu lebih dari SLOWMODE_MAX_WAIT).
+
+    Args:
+        client: Instance client Pyrogram
+        targets: Daftar chat_id tujuan
+        send: Coroutine function send(chat_id) yang melakukan satu pengiriman
+        path: Nama jalur broadcast untuk label metrik (gcast/bcfd/bcast/autobc)
+        stop: Fungsi opsional, broadcast berhenti bila mengembalikan True
+        on_progress: Coroutine function opsional on_progress(count), dipanggil saat
+            jumlah target terdepan (sesuai urutan targets) yang sudah selesai bertambah
+        track_dead: Catat kegagalan/keberhasilan per chat ke DEAD_CHATS. Target
+            sebaiknya sudah disaring dengan DEAD_CHATS.filter
+    """
+    engine = await get_send_engine(client)
+    await SLOWMODE.load(client.me.id)
+    result = BroadcastResult()
+    labels = {"account": client.me.id, "path": path}
+    started = time.monotonic()
+    pending = enumerate(targets)
+    retry_queue = []  # heap (deadline, seq, index, chat_id, attempts, slowmode)
+    seq = itertools.count()
+    in_flight = 0
+    finished = set()  # index target yang sudah selesai di luar prefix
+    low_water = 0  # semua target sebelum index ini sudah selesai
+
+    def next_target():
+        # Retry yang sudah jatuh tempo didahulukan, lalu target baru
+        if retry_queue and retry_queue[0][0] <= time.monotonic():
+            _, _, index, chat_id, attempts, slowmode = heapq.heappop(retry_queue)
+            # Antrean slow mode sudah dihitung di postponed, bukan retry FloodWait
+            if not slowmode:
+                result.retried += 1
+            return index, chat_id, attempts
+        index, chat_id = next(pending, (None, None))
+        return (index, chat_id, 0) if chat_id is not None else None
+
+    async def mark_finished(index):
+        nonlocal low_water
+        finished.add(index)
+        advanced = False
+        while low_water in finished:
+            finished.discard(low_water)
+            low_water += 1
+            advanced = True
+        if advanced and on_progress:
+            await on_progress(low_water)
+
+    async def timed_send(chat_id):
+        begin = time.monotonic()
+        try:
+            return await send(chat_id)
+        finally:
+            METRICS.observe(
+                "broadcast_send_latency_seconds", time.monotonic() - begin, LATENCY_BUCKETS, **labels
+            )
+
+    def record_failure(error, chat_id):
+        result.failed += 1
+        METRICS.inc("broadcast_failed_total", error=type(error).__name__, **labels)
+        if track_dead:
+            DEAD_CHATS.record_failure(client.me.id, chat_id, error)
+
+    async def worker():
+        nonlocal in_flight
+        while True:
+            if stop and stop():
+                result.stopped = True
+                return
+            item = next_target()
+            if item is None:
+                if not retry_queue and not in_flight:
+                    return
+                # Tunggu retry terdekat, atau worker lain yang mungkin menambah antrean
+                wait = retry_queue[0][0] - time.monotonic() if retry_queue else 1
+                await asyncio.sleep(min(max(wait, 0), 5))
+                continue
+
+            index, chat_id, attempts = item
+            wait = SLOWMODE.ready_in(client.me.id, chat_id)
+            if wait > SLOWMODE_MAX_WAIT:
+                result.skipped_slowmode += 1
+                METRICS.inc("broadcast_skipped_slowmode_total", **labels)
+                await mark_finished(index)
+                continue
+            if wait:
+                # Jendela slow mode belum lewat, kirim ke grup lain dulu
+                result.postponed += 1
+                heapq.heappush(
+                    retry_queue, (time.monotonic() + wait, next(seq), index, chat_id, attempts, True)
+                )
+                continue
+
+            in_flight += 1
+            deferred = False
+            try:
+                await engine.submit(timed_send, chat_id)
+                result.done += 1
+                METRICS.inc("broadcast_sent_total", **labels)
+                SLOWMODE.record_success(client.me.id, chat_id)
+                if track_dead:
+                    DEAD_CHATS.record_success(client.me.id, chat_id)
+            except SlowmodeWait as e:
+                SLOWMODE.record_wait(client.me.id, chat_id, e.value)
+                if e.value > SLOWMODE_MAX_WAIT or attempts + 1 >= BROADCAST_MAX_ATTEMPTS:
+                    record_failure(e, chat_id)
+                else:
+                    result.postponed += 1
+                    deferred = True
+                    heapq.heappush(
+                        retry_queue, (time.monotonic() + e.value, next(seq), index, chat_id, attempts + 1, True)
+                    )
+            except FloodWait as e:
+                METRICS.inc("broadcast_floodwait_seconds_total", e.value, **labels)
+                if attempts + 1 >= BROADCAST_MAX_ATTEMPTS:
+                    result.abandoned += 1
+                    record_failure(e, chat_id)
+                else:
+                    if not attempts:
+                        result.deferred += 1
+                    deferred = True
+                    deadline = time.monotonic() + e.value
+                    heapq.heappush(
+                        retry_queue, (deadline, next(seq), index, chat_id, attempts + 1, False)
+                    )
+            except ChannelPrivate as e:
+                # Sudah tidak menjadi anggota, buang dari indeks
+                discard_dialog(client, chat_id)
+                record_failure(e, chat_id)
+            except Exception as e:
+                record_failure(e, chat_id)
+            finally:
+                in_flight -= 1
+            if not deferred:
+                await mark_finished(index)
+
+    await asyncio.gather(*(worker() for _ in range(engine.concurrency)))
+    await SLOWMODE.save(client.me.id)
+    if track_dead:
+        await DEAD_CHATS.save(client.me.id)
+    METRICS.observe(
+        "broadcast_round_duration_seconds", time.monotonic() - started, ROUND_BUCKETS, **labels
+    )
+    return result
+
+
+class Scheduler:
+    """
+    Scheduler tunggal berbasis min-heap untuk job periodik per akun (autobc, timer, cek limit).
+    Loop hanya bangun saat job terdekat jatuh tempo, bukan satu task tidur per akun.
+
+    Job adalah coroutine function tanpa argumen yang mengembalikan jeda (detik)
+    sampai eksekusi berikutnya, atau None bila job selesai.
+    """
+
+    def __init__(self):
+        self._heap = []  # (due, seq, key)
+        self._jobs = {}  # key -> (job, due, seq)
+        self._running = {}  # key -> asyncio.Task
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._task = None
+        self.runs = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def schedule(self, key, job, delay=0):
+        """Daftarkan atau ganti job dengan key ini, berjalan setelah delay detik"""
+        due = time.monotonic() + delay
+        seq = next(self._seq)
+        self._jobs[key] = (job, due, seq)
+        heapq.heappush(self._heap, (due, seq, key))
+        self._ensure_running()
+        self._wakeup.set()
+
+    def reschedule(self, key, delay=0):
+        """Jalankan ulang job yang sudah terdaftar setelah delay detik"""
+        entry = self._jobs.get(key)
+        if entry:
+            self.schedule(key, entry[0], delay)
+
+    def cancel(self, key):
+        # Entri di heap dibuang belakangan saat muncul di puncak heap
+        self._jobs.pop(key, None)
+
+    def has(self, key):
+        return key in self._jobs
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = create_background_task(self._run())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            while self._heap:
+                due, seq, key = self._heap[0]
+                entry = self._jobs.get(key)
+                if entry is None or entry[2] != seq:
+                    # Sudah dibatalkan atau dijadwalkan ulang
+                    heapq.heappop(self._heap)
+                    continue
+                if due > now:
+                    break
+                heapq.heappop(self._heap)
+                if key in self._running:
+                    # Eksekusi sebelumnya belum selesai, coba lagi sebentar lagi
+                    self._jobs[key] = (entry[0], now + 1, seq)
+                    heapq.heappush(self._heap, (now + 1, seq, key))
+                    continue
+                lateness = now - due
+                self.runs += 1
+                self.total_lateness += lateness
+                self.max_lateness = max(self.max_lateness, lateness)
+                self._running[key] = create_background_task(self._execute(key, entry[0], seq))
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, key, job, seq):
+        delay = None
+        try:
+            delay = await job()
+        except Exception as e:
+            print(f"Error in scheduler job {key}: {e}")
+        finally:
+            self._running.pop(key, None)
+        entry = self._jobs.get(key)
+        if entry is None or entry[2] != seq:
+            # Dibatalkan atau sudah dijadwalkan ulang selama berjalan
+            return
+        if delay is None:
+            self._jobs.pop(key, None)
+        else:
+            self.schedule(key, job, delay)
+
+    def stats(self):
+        """Kedalaman antrean dan keterlambatan eksekusi job"""
+        now = time.monotonic()
+        due = [entry[1] for entry in self._jobs.values()]
+        return {
+            "jobs": len(self._jobs),
+            "running": len(self._running),
+            "overdue": sum(1 for when in due if when <= now),
+            "next_due_in": max(0.0, min(due) - now) if due else None,
+            "runs": self.runs,
+            "avg_lateness": self.total_lateness / self.runs if self.runs else 0.0,
+            "max_lateness": self.max_lateness,
+        }
+
+
+SCHEDULER = Scheduler()
+
+# Checkpoint autobc disimpan di vars AUTOBC_CHECKPOINT:
+# {"round": putaran yang sedang/akan berjalan, "pos": jumlah grup yang sudah dilayani,
+#  "after": chat_id grup terakhir yang dilayani, "next_at": unix time putaran boleh mulai}
+AUTOBC_CHECKPOINT_EVERY = 25  # simpan checkpoint setiap N grup
+
+
+def start_autobc(client, delay=0):
+    SCHEDULER.schedule(("autobc", client.me.id), lambda: autobc_task(client), delay)
+
+
+async def autobc_resume_delay(client):
+    """Sisa waktu tunggu (detik) menurut checkpoint sebelum putaran berikutnya boleh mulai"""
+    checkpoint = await SETTINGS.get(client.me.id, "AUTOBC_CHECKPOINT") or {}
+    next_at = checkpoint.get("next_at")
+    return max(0, next_at - time.time()) if next_at else 0
+
+
+def start_timer_checker(client, delay=0):
+    SCHEDULER.schedule(("timer", client.me.id), lambda: timer_checker_task(client), delay)
+
+
+def start_limit_check(client, delay=0):
+    SCHEDULER.schedule(("limit", client.me.id), lambda: limit_check_task(client), delay)
+
+
 # Fungsi untuk inisialisasi fitur yang sebelumnya aktif
+# Key yang dibaca sekaligus untuk semua akun saat startup
+# Sharding multi-proses (lihat shard.py): setiap worker hanya menjalankan akun miliknya
+SHARD_COUNT = max(1, int(os.getenv("UBOT_SHARDS", "1")))
+SHARD_INDEX = int(os.getenv("UBOT_SHARD_INDEX", "0"))
+SHARD_PORT_BASE = int(os.getenv("UBOT_SHARD_PORT", "0"))  # port kontrol = base + index, 0 = mati
+SHARD_TIMEOUT = 30  # detik, batas tunggu permintaan ke shard lain
+SHARD_STARTED = time.time()
+
+
+def shard_of(user_id):
+    return user_id % SHARD_COUNT
+
+
+async def claim_shard_clients():
+    """
+    Akun dibagi sebelum login oleh worker shard.py (get_userbots disaring user_id % N).
+    Di sini bot dihentikan di shard selain 0, sehingga perintah PY.BOT (bcast, bcubot)
+    dan inline selalu masuk ke shard 0. Akun shard lain yang masih ada berarti worker
+    dijalankan tanpa penyaring; akun itu dihentikan agar tidak diproses dua kali.
+    """
+    if SHARD_COUNT == 1:
+        return
+    for client in list(ubot._ubot):
+        if shard_of(client.me.id) != SHARD_INDEX:
+            print(f"Warning: client {client.me.id} started on shard {SHARD_INDEX}, run workers via shard.py --worker")
+            ubot._ubot.remove(client)
+            try:
+                await client.stop()
+            except Exception as e:
+                print(f"Error stopping client {client.me.id} for shard {SHARD_INDEX}: {e}")
+    if SHARD_INDEX != 0:
+        try:
+            await bot.stop()
+        except Exception as e:
+            print(f"Error stopping bot on shard {SHARD_INDEX}: {e}")
+
+
+def shard_health():
+    """Kesehatan dan beban worker ini, dikirim ke supervisor dan 'autobc shards'"""
+    return {
+        "shard": SHARD_INDEX,
+        "pid": os.getpid(),
+        "uptime": time.time() - SHARD_STARTED,
+        "clients": len(ubot._ubot),
+        "autobc": len(AG),
+        "limit": len(LT),
+        "timer": len(timer_checker_users),
+        "gcast": len(gcast_progress),
+        "scheduler": SCHEDULER.stats(),
+        "tasks": len(asyncio.all_tasks()),
+    }
+
+
+async def shard_unblock(username, force=()):
+    """
+    Buka blokir bot dari semua akun di worker ini (lihat unblock_bot).
+    force: id akun yang harus dibuka ulang walaupun tercatat sudah terbuka.
+    """
+    semaphore = asyncio.Semaphore(BCUBOT_CONCURRENCY)
+    response = {"ids": [], "failed": {}}
+
+    async def unblock(client):
+        async with semaphore:
+            try:
+                await unblock_bot(client, username, force=client.me.id in force)
+                response["ids"].append(client.me.id)
+            except Exception as e:
+                response["failed"][str(client.me.id)] = type(e).__name__
+
+    await asyncio.gather(*(unblock(client) for client in ubot._ubot))
+    return response
+
+
+async def handle_shard_command(payload):
+    command = payload.get("cmd")
+    if command == "health":
+        return shard_health()
+    if command == "unblock":
+        return await shard_unblock(payload["username"], set(payload.get("force", ())))
+    if command == "get_send":
+        message = SEND_REGISTRY.get(payload["token"])
+        return {"payload": send_payload(message) if message else None}
+    return {"error": f"unknown command {command}"}
+
+
+async def serve_shard(reader, writer):
+    # Satu permintaan JSON per koneksi, dibalas satu baris JSON
+    try:
+        payload = json.loads(await reader.readline())
+        try:
+            response = await handle_shard_command(payload)
+        except Exception as e:
+            response = {"error": str(e)}
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+    except Exception as e:
+        print(f"Error serving shard request: {e}")
+    finally:
+        writer.close()
+
+
+async def shard_request(index, payload, timeout=SHARD_TIMEOUT):
+    """Kirim satu perintah ke worker shard index, None bila tidak bisa dihubungi"""
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection("127.0.0.1", SHARD_PORT_BASE + index), timeout
+        )
+        try:
+            writer.write(json.dumps(payload).encode() + b"\n")
+            await writer.drain()
+            return json.loads(await asyncio.wait_for(reader.readline(), timeout))
+        finally:
+            writer.close()
+    except Exception as e:
+        print(f"Error contacting shard {index}: {e}")
+        return None
+
+
+async def other_shards(payload):
+    """Kirim perintah ke semua shard lain secara paralel -> {index: respons atau None}"""
+    if SHARD_COUNT == 1 or not SHARD_PORT_BASE:
+        return {}
+    indexes = [index for index in range(SHARD_COUNT) if index != SHARD_INDEX]
+    responses = await asyncio.gather(*(shard_request(index, payload) for index in indexes))
+    return dict(zip(indexes, responses))
+
+
+async def start_shard_control():
+    await claim_shard_clients()
+    if SHARD_COUNT > 1 and SHARD_PORT_BASE:
+        try:
+            await asyncio.start_server(serve_shard, "127.0.0.1", SHARD_PORT_BASE + SHARD_INDEX)
+        except Exception as e:
+            print(f"Error starting shard control on shard {SHARD_INDEX}: {e}")
+
+
+STARTUP_KEYS = ("AUTO_GCAST_ACTIVE", "AUTO_LIMIT_CHECK_ACTIVE", "AUTOBC_TIMER", "AUTOBC_CHECKPOINT")
+STARTUP_STAGGER = 0.5  # jeda (detik) antar akun saat mengaktifkan kembali autobc/limit
+
+
 async def init_active_features():
-    # Cek dan aktifkan kembali fitur autobc yang sebelumnya aktif
-    for client in ubot._ubot:
-        autobc_active = await get_vars(client.me.id, "AUTO_GCAST_ACTIVE")
+    started = time.monotonic()
+    SETTINGS.watch_shutdown()
+    await start_shard_control()
+    await start_metrics_export()
+    clients = list(ubot._ubot)
+
+    # Baca semua pengaturan yang dibutuhkan untuk semua akun sekaligus
+    loaded = await SETTINGS.prefetch([client.me.id for client in clients], STARTUP_KEYS)
+    fetched = time.monotonic()
+
+    counts = {"autobc": 0, "limit": 0, "timer": 0}
+    for client in clients:
+        # Cek dan aktifkan kembali fitur autobc yang sebelumnya aktif
+        autobc_active = await SETTINGS.get(client.me.id, "AUTO_GCAST_ACTIVE")
         if autobc_active and client.me.id not in AG:
             AG.append(client.me.id)
-            # Aktifkan kembali autobc untuk user ini
-            asyncio.create_task(autobc_task(client))
+            # Aktifkan kembali autobc, lanjut dari checkpoint dan dijadwalkan bergiliran
+            stagger = counts["autobc"] * STARTUP_STAGGER
+            start_autobc(client, max(stagger, await autobc_resume_delay(client)))
+            counts["autobc"] += 1
             
-        limit_active = await get_vars(client.me.id, "AUTO_LIMIT_CHECK_ACTIVE")
+        limit_active = await SETTINGS.get(client.me.id, "AUTO_LIMIT_CHECK_ACTIVE")
         if limit_active and client.me.id not in LT:
             LT.append(client.me.id)
             # Aktifkan kembali limit check untuk user ini
-            asyncio.create_task(limit_check_task(client))
+            start_limit_check(client, counts["limit"] * STARTUP_STAGGER)
+            counts["limit"] += 1
             
         # Cek dan aktifkan kembali timer checker untuk user yang memiliki timer aktif
-        timer_settings = await get_vars(client.me.id, "AUTOBC_TIMER")
+        timer_settings = await SETTINGS.get(client.me.id, "AUTOBC_TIMER")
         if timer_settings and timer_settings.get("enabled") and client.me.id not in timer_checker_users:
             timer_checker_users.append(client.me.id)
             # Aktifkan kembali timer checker untuk user ini
-            asyncio.create_task(timer_checker_task(client))
+            start_timer_checker(client)
+            counts["timer"] += 1
+
+    finished = time.monotonic()
+    print(
+        f"init_active_features: {len(clients)} akun | "
+        f"baca vars {fetched - started:.2f}s ({loaded} key) | "
+        f"aktivasi {finished - fetched:.2f}s | "
+        f"autobc {counts['autobc']}, limit {counts['limit']}, timer {counts['timer']} | "
+        f"total {finished - started:.2f}s"
+    )
+
+# Jalankan inisialisasi saat bot dimulai
+asyncio.create_task(init_active_features())
+
+class TimerWindow:
+    """
+    Jendela waktu timer autobc yang sudah di-parse.
+    Menit akhir ikut dihitung aktif, sama seperti perilaku is_time_between sebelumnya,
+    dan jendela boleh melewati tengah malam (contoh 22:00-02:00).
+    """
+
+    def __init__(self, start_time, end_time):
+        self.start = self._parse(start_time)
+        end = self._parse(end_time)
+        # Panjang jendela dalam detik, termasuk menit akhir
+        self.length = ((end - self.start) % 1440 + 1) * 60
+
+    @staticmethod
+    def _parse(value):
+        hours, minutes = map(int, value.split(":"))
+        return hours * 60 + minutes
+
+    def _offset(self, now):
+        # Detik sejak waktu mulai, dibungkus dalam satu hari
+        seconds = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+        return (seconds - self.start * 60) % 86400
+
+    def is_active(self, now):
+        return self._offset(now) < self.length
+
+    def seconds_until_transition(self, now):
+        """Detik sampai status aktif/nonaktif berubah berikutnya"""
+        if self.length >= 86400:
+            # Aktif sepanjang hari, tidak pernah berubah
+            return 86400
+        offset = self._offset(now)
+        if offset < self.length:
+            return self.length - offset
+        return 86400 - offset
+
+
+@lru_cache(maxsize=256)
+def get_timer_window(start_time, end_time):
+    return TimerWindow(start_time, end_time)
+
+
+# Helper function untuk memeriksa apakah waktu saat ini berada di antara waktu mulai dan akhir
+def is_time_between(start_time, end_time, current_time):
+    """
+    Memeriksa apakah current_time berada di antara start_time dan end_time.
+    Semua waktu harus dalam format "HH:MM".
+    """
+    hours, minutes = map(int, current_time.split(":"))
+    return get_timer_window(start_time, end_time).is_active(dt.time(hours, minutes))
+
+TIMER_RETRY_DELAY = 60  # detik, cek ulang selama jendela timer aktif tapi autobc belum bisa dimulai
+
+
+# Fungsi untuk memeriksa timer dan mengaktifkan/menonaktifkan autobc secara otomatis
+# Dijalankan oleh SCHEDULER, mengembalikan jeda sampai perubahan status timer berikutnya
+async def timer_checker_task(client):
+    try:
+        if client.me.id not in timer_checker_users:
+            return None
+        
+        emo = await get_emo(client)
+        brhsl = emo.BERHASIL
+        ggl = emo.GAGAL
+        
+        timer_settings = await SETTINGS.get(client.me.id, "AUTOBC_TIMER") or {}
+        
+        if timer_settings.get("enabled"):
+            start_time = timer_settings.get("start_time")
+            end_time = timer_settings.get("end_time")
+            
+            if start_time and end_time:
+                window = get_timer_window(start_time, end_time)
+                # Dapatkan waktu saat ini
+                current = dt.datetime.now()
+                now = current.strftime("%H:%M")
+                
+                # Periksa apakah waktu saat ini berada dalam waktu siaran terjadwal
+                should_be_active = window.is_active(current)
+                
+                # Jika seharusnya aktif tapi tidak aktif saat ini
+                if should_be_active and client.me.id not in AG:
+                    # Pastikan kita memiliki pesan auto text
+                    auto_text_vars = await SETTINGS.get(client.me.id, "AUTO_TEXT")
+                    if auto_text_vars:
+                        # Set flag bahwa autobc aktif
+                        await SETTINGS.set(client.me.id, "AUTO_GCAST_ACTIVE", True)
+                        AG.append(client.me.id)
+                        # Jalankan autobc di background
+                        start_autobc(client)
+                        
+                        # Catat bahwa autobc dimulai oleh timer
+                        await report_status(
+                            client, f"{brhsl}Auto gcast diaktifkan oleh timer pada {now}"
+                        )
+                    else:
+                        # Belum ada pesan, cek lagi sebentar lagi supaya "autobc text" ikut terpakai
+                        return TIMER_RETRY_DELAY
+                
+                # Jika seharusnya tidak aktif tapi aktif saat ini
+                elif not should_be_active and client.me.id in AG:
+                    # Set flag bahwa autobc tidak aktif
+                    await SETTINGS.set(client.me.id, "AUTO_GCAST_ACTIVE", False)
+                    AG.remove(client.me.id)
+                    
+                    # Catat bahwa autobc dihentikan oleh timer
+                    await report_status(
+                        client, f"{brhsl}Auto gcast dinonaktifkan oleh timer pada {now}"
+                    )
+        
+                # Tidur sampai tepat setelah perubahan status berikutnya
+                return window.seconds_until_transition(dt.datetime.now()) + 1
+        
+        # Timer nonaktif, job dijalankan ulang saat "autobc timer" diatur lagi
+        return None
+    except Exception as e:
+        print(f"Error in timer_checker_task: {e}")
+        if client.me.id in timer_checker_users:
+            timer_checker_users.remove(client.me.id)
+
+def message_pool(auto_messages, chat_id):
+    """
+    Daftar pesan yang dipakai autobc untuk satu grup.
+    Pesan khusus grup didahulukan, kalau tidak ada memakai default.
+
+    Returns:
+        tuple: ("Khusus"/"Default"/None, daftar pesan)
+    """
+    if auto_messages.get(str(chat_id)):
+        return "Khusus", auto_messages[str(chat_id)]
+    if auto_messages.get("default"):
+        return "Default", auto_messages["default"]
+    return None, []
+
+
+def prepare_auto_message(msg_data, resolved_refs):
+    """
+    Ubah satu entri AUTO_TEXT menjadi (source_msg, text_content).
+    Mengembalikan None bila pesan sumbernya belum bisa diambil.
+    """
+    if isinstance(msg_data, dict):  # New format
+        if msg_data.get("type") == "message_ref":
+            source_msg = resolved_refs.get(message_ref_key(msg_data))
+            return (source_msg, None) if source_msg else None
+        if msg_data.get("type") == "text":
+            return None, msg_data.get("content")
+        return None, None
+    # Legacy format (just text)
+    return None, msg_data
+
+
+async def plan_autobc(client):
+    """
+    Simulasi satu putaran autobc tanpa mengirim apa pun.
 
-# Jalankan inisialisasi saat bot dimulai
-asyncio.create_task(init_active_features())
+    Memakai pemilihan pesan yang sama dengan autobc_task (blacklist, pesan khusus
+    grup vs default, ref yang hilang, checkpoint, mode forward/copy) tetapi tidak
+    menyimpan perubahan apa pun. Durasi diperkirakan dari pengaturan engine dan
+    rata-rata latensi kirim yang tercatat di metrik.
 
-# Helper function untuk memeriksa apakah waktu saat ini berada di antara waktu mulai dan akhir
-# Helper function untuk memeriksa apakah waktu saat ini berada di antara waktu mulai dan akhir
-def is_time_between(start_time, end_time, current_time):
+    Returns:
+        dict: Ringkasan rencana putaran
     """
-    Memeriksa apakah current_time berada di antara start_time dan end_time.
-    Semua waktu harus dalam format "HH:MM".
+    auto_messages = await SETTINGS.get(client.me.id, "AUTO_TEXT") or {}
+    if isinstance(auto_messages, list):
+        auto_messages = {"default": auto_messages}
+    forward_mode = await SETTINGS.get(client.me.id, "AUTOBC_FORWARD_MODE") or False
+    checkpoint = await SETTINGS.get(client.me.id, "AUTOBC_CHECKPOINT") or {}
+    resume_after = checkpoint.get("after")
+    blacklist = await get_blacklist(client)
+
+    resolved_refs, missing_refs = await resolve_message_refs(client, auto_messages)
+    prune_missing_refs(auto_messages, missing_refs)
+
+    index = await get_dialog_index(client)
+    titles = dict(index.items(*DIALOG_QUERY_TYPES["group"]))
+    plan = {
+        "mode": "FORWARD" if forward_mode else "COPY",
+        "groups": len(titles),
+        "blacklisted": 0,
+        "dead": 0,
+        "already_sent": 0,
+        "no_message": 0,
+        "unavailable": 0,
+        "targets": 0,
+        "pools": {},  # "Khusus"/"Default" -> jumlah grup
+        "missing_refs": len(missing_refs),
+        "resume_round": checkpoint.get("round") or 1,
+        "sample": [],  # (title, jenis, jumlah pesan)
+    }
+    dead = {chat_id: DEAD_CHATS.blocked_until(entry) for chat_id, entry in await DEAD_CHATS.items(client.me.id)}
+    now = time.time()
+    for dialog_id in sorted(titles):
+        if dialog_id in blacklist:
+            plan["blacklisted"] += 1
+            continue
+        if dead.get(str(dialog_id), 0) > now:
+            plan["dead"] += 1
+            continue
+        if resume_after is not None and dialog_id <= resume_after:
+            plan["already_sent"] += 1
+            continue
+        kind, group_messages = message_pool(auto_messages, dialog_id)
+        if not group_messages:
+            plan["no_message"] += 1
+            continue
+        # Grup dilewati bila tidak ada satu pun pesan di pool yang bisa dikirim
+        usable = sum(1 for msg_data in group_messages if prepare_auto_message(msg_data, resolved_refs))
+        if not usable:
+            plan["unavailable"] += 1
+            continue
+        plan["targets"] += 1
+        plan["pools"][kind] = plan["pools"].get(kind, 0) + 1
+        if len(plan["sample"]) < 10:
+            plan["sample"].append((titles[dialog_id], kind, usable))
+
+    engine = await get_send_engine(client)
+    latency = METRICS.account_summary(client.me.id).get("autobc", {}).get(
+        "broadcast_send_latency_seconds", 0.0
+    )
+    per_send = max(1 / engine.rate, latency / engine.concurrency)
+    plan["latency"] = latency
+    plan["estimate"] = plan["targets"] * per_send
+    plan["restriction"] = RESTRICTION.cached(client.me.id)
+    return plan
+
+
+# Laporan status autobc/timer, diatur lewat "autobc report" (vars AUTOBC_REPORT):
+# {"mode": "each"/"digest"/"pin", "interval": menit, "message_id": id pesan yang di-pin}
+DIGEST_INTERVAL = 60  # menit
+DIGEST_EVENTS = 10  # catatan timer terakhir yang ikut di ringkasan
+STATUS_DIGESTS = {}  # user_id -> StatusDigest
+
+
+class StatusDigest:
+    """Hasil putaran autobc dan catatan timer yang dikumpulkan sampai ringkasan berikutnya"""
+
+    def __init__(self):
+        self.total_rounds = 0
+        self.total_sent = 0
+        self.total_failed = 0
+        self.reset()
+
+    def reset(self):
+        self.since = time.time()
+        self.rounds = 0
+        self.sent = 0
+        self.failed = 0
+        self.deferred = 0
+        self.last_round = None
+        self.events = []  # (unix time, teks)
+
+    def add_round(self, round_no, result):
+        self.rounds += 1
+        self.sent += result.done
+        self.failed += result.failed
+        self.deferred += result.deferred
+        self.last_round = round_no
+        self.total_rounds += 1
+        self.total_sent += result.done
+        self.total_failed += result.failed
+
+    def add_event(self, text):
+        self.events.append((time.time(), text))
+        del self.events[:-DIGEST_EVENTS]
+
+    def render(self, bcs):
+        def fmt(when):
+            return dt.datetime.fromtimestamp(when).strftime("%d/%m %H:%M")
+
+        txt = f"{bcs}Ringkasan autobc {fmt(self.since)} - {fmt(time.time())}\n"
+        txt += f"putaran: {self.rounds}"
+        if self.last_round is not None:
+            txt += f" (terakhir #{self.last_round})"
+        txt += f"\nterkirim: {self.sent}\ngagal: {self.failed}\n"
+        if self.deferred:
+            txt += f"FloodWait: {self.deferred} grup ditunda\n"
+        txt += (
+            f"\nTotal sejak bot berjalan: {self.total_rounds} putaran, "
+            f"{self.total_sent} terkirim, {self.total_failed} gagal\n"
+        )
+        if self.events:
+            txt += "\nCatatan:\n"
+            for when, text in self.events:
+                txt += f" {fmt(when)} {text}\n"
+        return txt
+
+
+async def report_status(client, text, round_no=None, result=None):
     """
-    # Konversi string ke objek datetime
-    start = dt.datetime.strptime(start_time, "%H:%M")
-    end = dt.datetime.strptime(end_time, "%H:%M")
-    current = dt.datetime.strptime(current_time, "%H:%M")
-    
-    # Menangani kasus di mana waktu akhir ada di hari berikutnya
-    if end < start:
-        return start <= current or current <= end
+    Laporan putaran (result diisi) atau catatan timer ke Saved Messages.
+    Mode "each" langsung mengirim text, mode digest/pin mengumpulkannya dan
+    flush_status_digest mengirim satu ringkasan per interval.
+    """
+    config = await SETTINGS.get(client.me.id, "AUTOBC_REPORT") or {}
+    if config.get("mode", "each") == "each":
+        try:
+            await client.send_message(client.me.id, text)
+        except Exception:
+            pass
+        return
+    digest = STATUS_DIGESTS.setdefault(client.me.id, StatusDigest())
+    if result is not None:
+        digest.add_round(round_no, result)
     else:
-        return start <= current <= end
-
-# Fungsi untuk memeriksa timer dan mengaktifkan/menonaktifkan autobc secara otomatis
-async def timer_checker_task(client):
+        digest.add_event(text)
+    key = ("digest", client.me.id)
+    if not SCHEDULER.has(key):
+        interval = 60 * config.get("interval", DIGEST_INTERVAL)
+        SCHEDULER.schedule(key, lambda: flush_status_digest(client), interval)
+
+
+async def flush_status_digest(client):
+    """Job scheduler: kirim ringkasan baru (digest) atau edit pesan yang di-pin (pin)"""
+    digest = STATUS_DIGESTS.get(client.me.id)
+    if digest is None or not (digest.rounds or digest.events):
+        return None
+    config = await SETTINGS.get(client.me.id, "AUTOBC_REPORT") or {}
+    emo = await get_emo(client)
+    text = digest.render(emo.BROADCAST)
     try:
-        brhsl = await EMO.BERHASIL(client)
-        ggl = await EMO.GAGAL(client)
-        
-        while client.me.id in timer_checker_users:
-            timer_settings = await get_vars(client.me.id, "AUTOBC_TIMER") or {}
-            
-            if timer_settings.get("enabled"):
-                start_time = timer_settings.get("start_time")
-                end_time = timer_settings.get("end_time")
-                
-                if start_time and end_time:
-                    # Dapatkan waktu saat ini
-                    now = dt.datetime.now().strftime("%H:%M")
-                    
-                    # Periksa apakah waktu saat ini berada dalam waktu siaran terjadwal
-                    should_be_active = is_time_between(start_time, end_time, now)
-                    
-                    # Jika seharusnya aktif tapi tidak aktif saat ini
-                    if should_be_active and client.me.id not in AG:
-                        # Pastikan kita memiliki pesan auto text
-                        auto_text_vars = await get_vars(client.me.id, "AUTO_TEXT")
-                        if auto_text_vars:
-                            # Set flag bahwa autobc aktif
-                            await set_vars(client.me.id, "AUTO_GCAST_ACTIVE", True)
-                            AG.append(client.me.id)
-                            # Jalankan autobc di background
-                            asyncio.create_task(autobc_task(client))
-                            
-                            # Catat bahwa autobc dimulai oleh timer
-                            try:
-                                await client.send_message(
-                                    client.me.id, 
-                                    f"{brhsl}Auto gcast diaktifkan oleh timer pada {now}"
-                                )
-                            except Exception:
-                                pass
-                    
-                    # Jika seharusnya tidak aktif tapi aktif saat ini
-                    elif not should_be_active and client.me.id in AG:
-                        # Set flag bahwa autobc tidak aktif
-                        await set_vars(client.me.id, "AUTO_GCAST_ACTIVE", False)
-                        AG.remove(client.me.id)
-                        
-                        # Catat bahwa autobc dihentikan oleh timer
-                        try:
-                            await client.send_message(
-                                client.me.id, 
-                                f"{brhsl}Auto gcast dinonaktifkan oleh timer pada {now}"
-                            )
-                        except Exception:
-                            pass
-            
-            # Periksa setiap menit
-            await asyncio.sleep(60)
+        if config.get("mode") == "pin":
+            try:
+                await client.edit_message_text(client.me.id, config["message_id"], text)
+            except Exception:
+                # Pesan belum ada atau sudah dihapus, buat dan pin yang baru
+                sent = await client.send_message(client.me.id, text)
+                await client.pin_chat_message(client.me.id, sent.id, disable_notification=True)
+                config["message_id"] = sent.id
+                await SETTINGS.set(client.me.id, "AUTOBC_REPORT", config)
+        else:
+            await client.send_message(client.me.id, text)
     except Exception as e:
-        print(f"Error in timer_checker_task: {e}")
-        if client.me.id in timer_checker_users:
-            timer_checker_users.remove(client.me.id)
+        print(f"Error sending status digest: {e}")
+        return None
+    digest.reset()
+    return None
+
 
 # Modified autobc_task function to handle message references
 # fix by @hiyaok
+# Satu putaran autobc, dijalankan oleh SCHEDULER. Mengembalikan jeda ke putaran berikutnya
 async def autobc_task(client):
     try:
-        done = 0
-        while client.me.id in AG:
-            delay = await get_vars(client.me.id, "DELAY_GCAST") or 1
-            auto_messages = await get_vars(client.me.id, "AUTO_TEXT") or {}
-            
-            # Convert to new format if needed
-            if isinstance(auto_messages, list):  # Perbaikan: menggunakan lowercase list
-                auto_messages = {"default": auto_messages}
-            
-            # Get broadcast mode (copy or forward)
-            forward_mode = await get_vars(client.me.id, "AUTOBC_FORWARD_MODE") or False
-            
-            if not auto_messages or not auto_messages.get("default", []):
-                if not any(auto_messages.values()):  # Check if any group has messages
-                    AG.remove(client.me.id)
-                    await set_vars(client.me.id, "AUTO_GCAST_ACTIVE", False)
-                    break
-            
-            blacklist = await get_list_from_vars(client.me.id, "BL_ID")
-            bcs = await EMO.BROADCAST(client)
-            brhsl = await EMO.BERHASIL(client)
-            mng = await EMO.MENUNGGU(client)
-            ggl = await EMO.GAGAL(client)
-            
-            group_count = 0
-            groups_with_messages = {}  # Track which groups received messages
+        if client.me.id not in AG:
+            return None
+        
+        delay = await SETTINGS.get(client.me.id, "DELAY_GCAST") or 1
+        auto_messages = await SETTINGS.get(client.me.id, "AUTO_TEXT") or {}
+        
+        # Convert to new format if needed
+        if isinstance(auto_messages, list):  # Perbaikan: menggunakan lowercase list
+            auto_messages = {"default": auto_messages}
+        
+        # Get broadcast mode (copy or forward)
+        forward_mode = await SETTINGS.get(client.me.id, "AUTOBC_FORWARD_MODE") or False
+        
+        if not auto_messages or not auto_messages.get("default", []):
+            if not any(auto_messages.values()):  # Check if any group has messages
+                AG.remove(client.me.id)
+                await SETTINGS.set(client.me.id, "AUTO_GCAST_ACTIVE", False)
+                return None
+        
+        blacklist = await get_blacklist(client)
+        emo = await get_emo(client)
+        bcs = emo.BROADCAST
+        brhsl = emo.BERHASIL
+        mng = emo.MENUNGGU
+        ggl = emo.GAGAL
+        
+        assignments = {}  # dialog_id -> (title, source_msg, text_content)
+        groups_with_messages = {}  # Track which groups received messages
+        
+        # Ambil semua pesan sumber sekaligus dan buang yang sudah hilang
+        resolved_refs, missing_refs = await resolve_message_refs(client, auto_messages)
+        pruned = prune_missing_refs(auto_messages, missing_refs)
+        
+        # Lanjutkan putaran yang terputus dari checkpoint
+        checkpoint = await SETTINGS.get(client.me.id, "AUTOBC_CHECKPOINT") or {}
+        round_no = checkpoint.get("round") or 1
+        resume_pos = checkpoint.get("pos") or 0
+        resume_after = checkpoint.get("after")
+        
+        # Ambil daftar grup dari indeks dialog, urut berdasarkan id supaya posisi stabil
+        index = await get_dialog_index(client)
+        titles = dict(index.items(*DIALOG_QUERY_TYPES["group"]))
+        candidates = await DEAD_CHATS.filter(
+            client, filter_blacklisted(client, list(titles), blacklist, "autobc"), "autobc"
+        )
+        dialogs = sorted(
+            (dialog_id, titles[dialog_id])
+            for dialog_id in candidates
+            if resume_after is None or dialog_id > resume_after
+        )
+        
+        # Process each dialog
+        for dialog_id, title in dialogs:
+            # Determine which message set to use for this group
+            _, group_messages = message_pool(auto_messages, dialog_id)
+            if not group_messages:
+                # Skip this group as no messages are available
+                continue
             
-            # Get all dialogs (chats) first
-            dialogs = []
-            async for dialog in client.get_dialogs():
-                if (
-                    dialog.chat.type in (ChatType.GROUP, ChatType.SUPERGROUP)
-                    and dialog.chat.id not in blacklist
-                    and dialog.chat.id not in BLACKLIST_CHAT
-                ):
-                    dialogs.append(dialog)
+            # Prepare the message to broadcast
+            prepared = prepare_auto_message(random.choice(group_messages), resolved_refs)
+            if prepared is None:
+                # Belum bisa diambil di putaran ini
+                continue
             
-            # Process each dialog
-            for dialog in dialogs:
-                chat_id = str(dialog.chat.id)
-                
-                # Determine which message set to use for this group
-                if chat_id in auto_messages and auto_messages[chat_id]:
-                    # Use group-specific messages
-                    group_messages = auto_messages[chat_id]
-                    msg_data = random.choice(group_messages)
-                elif "default" in auto_messages and auto_messages["default"]:
-                    # Use default messages
-                    group_messages = auto_messages["default"]
-                    msg_data = random.choice(group_messages)
+            assignments[dialog_id] = (title, *prepared)
+        
+        # Kirim ke semua grup lewat engine pengiriman
+        async def send_to_group(dialog_id):
+            title, source_msg, text_content = assignments[dialog_id]
+            if source_msg:
+                if forward_mode:
+                    # Use forward if in forward mode
+                    await source_msg.forward(dialog_id)
                 else:
-                    # Skip this group as no messages are available
-                    continue
-                
-                # Prepare the message to broadcast
-                source_msg = None
-                text_content = None
-                missing_message = False
-                
-                if isinstance(msg_data, dict):  # New format
-                    if msg_data.get("type") == "message_ref":
-                        # Try to get the referenced message
-                        try:
-                            ref_chat_id = msg_data.get("chat_id")
-                            message_id = msg_data.get("message_id")
-                            source_msg = await client.get_messages(ref_chat_id, message_id)
-                            if not source_msg:
-                                missing_message = True
-                        except Exception:
-                            missing_message = True
-                    elif msg_data.get("type") == "text":
-                        text_content = msg_data.get("content")
-                else:  # Legacy format (just text)
-                    text_content = msg_data
-                
-                # If the message no longer exists
-                if missing_message:
-                    # Remove the missing message from auto_messages
-                    target_key = chat_id if chat_id in auto_messages else "default"
-                    auto_messages[target_key] = [m for m in auto_messages[target_key] if not (
-                        isinstance(m, dict) and
-                        m.get("type") == "message_ref" and
-                        m.get("chat_id") == msg_data.get("chat_id") and
-                        m.get("message_id") == msg_data.get("message_id")
-                    )]
-                    
-                    # Continue to next dialog
-                    continue
-                
-                # Attempt to send message
-                try:
-                    await asyncio.sleep(1)
-                    if source_msg:
-                        if forward_mode:
-                            # Use forward if in forward mode
-                            await source_msg.forward(dialog.chat.id)
-                        else:
-                            # Use copy to preserve premium emoji (default)
-                            await source_msg.copy(dialog.chat.id)
-                    else:
-                        await client.send_message(dialog.chat.id, text_content)
-                    
-                    group_count += 1
-                    groups_with_messages[dialog.chat.title] = chat_id
-                except FloodWait as e:
-                    await asyncio.sleep(e.value)
-                    try:
-                        if source_msg:
-                            if forward_mode:
-                                await source_msg.forward(dialog.chat.id)
-                            else:
-                                await source_msg.copy(dialog.chat.id)
-                        else:
-                            await client.send_message(dialog.chat.id, text_content)
-                        
-                        group_count += 1
-                        groups_with_messages[dialog.chat.title] = chat_id
-                    except Exception:
-                        pass
-                except Exception:
-                    pass
-            
-            # Save updated auto_messages to remove any missing messages
-            await set_vars(client.me.id, "AUTO_TEXT", auto_messages)
-            
-            if client.me.id not in AG:
-                break
-            
-            done += 1
-            
-            # Prepare detailed report of sent messages
-            report = f"{bcs}auto_gcat done (Mode: {'FORWARD' if forward_mode else 'COPY'})\n"
-            report += f"putaran {done}\n"
-            report += f"{brhsl}ucce {group_count} group\n"
-            
-            # Add details of which groups received messages (limited to first 10)
-            if groups_with_messages:
-                groups_list = list(groups_with_messages.items())
-                report += "\nDetail grup (max 10):\n"
-                for i, (group_name, group_id) in enumerate(groups_list[:10], 1):
-                    msg_type = "Khusus" if group_id in auto_messages else "Default"
-                    report += f"{i}. {group_name} - {msg_type}\n"
-                
-                if len(groups_list) > 10:
-                    report += f"...dan {len(groups_list) - 10} grup lainnya\n"
-            
-            report += f"\n{mng}wait {delay} minute"
-            
-            # Kirim pesan status ke private chat user
-            try:
-                await client.send_message(client.me.id, report)
-            except Exception:
-                pass
+                    # Use copy to preserve premium emoji (default)
+                    await source_msg.copy(dialog_id)
+            else:
+                await send_parsed_text(client, dialog_id, text_content)
+            groups_with_messages[title] = str(dialog_id)
+        
+        targets = list(assignments)
+        saved = {"pos": 0}
+        
+        async def save_checkpoint(count):
+            # Simpan posisi setiap AUTOBC_CHECKPOINT_EVERY grup
+            if count - saved["pos"] < AUTOBC_CHECKPOINT_EVERY and count < len(targets):
+                return
+            saved["pos"] = count
+            await SETTINGS.set(client.me.id, "AUTOBC_CHECKPOINT", {
+                "round": round_no,
+                "pos": resume_pos + count,
+                "after": targets[count - 1],
+                "next_at": None,
+            })
+        
+        result = await run_broadcast(
+            client, targets, send_to_group, "autobc", on_progress=save_checkpoint, track_dead=True
+        )
+        group_count = result.done
+        
+        # Putaran selesai, catat kapan putaran berikutnya boleh mulai
+        await SETTINGS.set(client.me.id, "AUTOBC_CHECKPOINT", {
+            "round": round_no + 1,
+            "pos": 0,
+            "after": None,
+            "next_at": time.time() + int(60 * int(delay)),
+        })
+        
+        # Buang pesan yang hilang dari nilai terbaru, bukan salinan awal putaran,
+        # supaya "autobc text"/"autobc remove" selama putaran tidak tertimpa
+        if pruned:
+            latest = await SETTINGS.get(client.me.id, "AUTO_TEXT") or {}
+            if isinstance(latest, list):
+                latest = {"default": latest}
+            prune_missing_refs(latest, missing_refs)
+            await SETTINGS.set(client.me.id, "AUTO_TEXT", latest)
+        
+        if client.me.id not in AG:
+            return None
+        
+        done = round_no
+        
+        # Prepare detailed report of sent messages
+        report = f"{bcs}auto_gcat done (Mode: {'FORWARD' if forward_mode else 'COPY'})\n"
+        report += f"putaran {done}\n"
+        report += f"{brhsl}ucce {group_count} group\n"
+        
+        # Add details of which groups received messages (limited to first 10)
+        if groups_with_messages:
+            groups_list = list(groups_with_messages.items())
+            report += "\nDetail grup (max 10):\n"
+            for i, (group_name, group_id) in enumerate(groups_list[:10], 1):
+                msg_type = "Khusus" if group_id in auto_messages else "Default"
+                report += f"{i}. {group_name} - {msg_type}\n"
             
-            await asyncio.sleep(int(60 * int(delay)))
+            if len(groups_list) > 10:
+                report += f"...dan {len(groups_list) - 10} grup lainnya\n"
+        
+        if result.deferred:
+            report += f"\nFloodWait: {result.retry_summary()}\n"
+        if result.slowmode_summary():
+            report += f"\nSlow mode: {result.slowmode_summary()}\n"
+        
+        report += f"\n{mng}wait {delay} minute"
+        
+        # Kirim pesan status ke private chat user (atau kumpulkan untuk ringkasan)
+        await report_status(client, report, round_no=done, result=result)
+        
+        return int(60 * int(delay))
     except Exception as e:
         print(f"Error in autobc_task: {e}")
         if client.me.id in AG:
             AG.remove(client.me.id)
-            await set_vars(client.me.id, "AUTO_GCAST_ACTIVE", False)
+            await SETTINGS.set(client.me.id, "AUTO_GCAST_ACTIVE", False)
+
+# Fungsi untuk menjalankan limit check sebagai job scheduler
+# Status pembatasan akun dari @SpamBot, di-cache supaya handler tidak perlu cek ulang
+SPAMBOT = "SpamBot"
+LIMIT_STATUS_TTL = 20 * 60  # detik, juga jeda cek limit otomatis
+LIMIT_PROBE_TIMEOUT = 15  # detik menunggu balasan SpamBot
+LIMIT_HANDLER_GROUP = 98
+LIMIT_FREE_MARKERS = ("no limits", "free as a bird", "tidak ada batasan")
+LIMIT_UNTIL_PATTERN = re.compile(r"(\d{1,2} \w+ \d{4}(?:,? \d{1,2}:\d{2}(?: UTC)?)?)")
+
+
+class RestrictionStatus:
+    """Hasil satu pengecekan SpamBot"""
+
+    __slots__ = ("text", "limited", "until", "checked_at")
+
+    def __init__(self, text):
+        self.text = text or ""
+        lowered = self.text.lower()
+        # Balasan "bebas" SpamBot pendek, balasan terbatas panjang dan berisi tanggal
+        self.limited = not (len(self.text) <= 100 or any(marker in lowered for marker in LIMIT_FREE_MARKERS))
+        match = LIMIT_UNTIL_PATTERN.search(self.text) if self.limited else None
+        self.until = match.group(1) if match else None
+        self.checked_at = time.time()
+
+    @property
+    def age(self):
+        return time.time() - self.checked_at
+
+
+class RestrictionProbe:
+    """
+    Cek limit akun: kirim /start ke SpamBot lewat StartBot lalu tunggu balasannya
+    (ditangkap handler di LIMIT_HANDLER_GROUP), tanpa menebak id pesan balasan.
+    Hasil di-cache LIMIT_STATUS_TTL detik; pemanggil yang bersamaan berbagi satu probe.
+    """
+
+    def __init__(self):
+        self._status = {}  # user_id -> RestrictionStatus
+        self._inflight = {}  # user_id -> asyncio.Task
+        self._waiters = {}  # user_id -> Future balasan SpamBot
+        self._unblocked = set()  # user_id yang sudah membuka blokir SpamBot
+
+    def cached(self, user_id, max_age=LIMIT_STATUS_TTL):
+        """Status terakhir bila umurnya <= max_age (None = berapa pun umurnya)"""
+        status = self._status.get(user_id)
+        if status and (max_age is None or status.age <= max_age):
+            return status
+        return None
+
+    async def get(self, client, max_age=LIMIT_STATUS_TTL):
+        status = self.cached(client.me.id, max_age)
+        if status:
+            return status
+        task = self._inflight.get(client.me.id)
+        if task is None:
+            task = self._inflight[client.me.id] = create_background_task(self._probe(client))
+            task.add_done_callback(lambda _: self._inflight.pop(client.me.id, None))
+        return await asyncio.shield(task)
+
+    def on_reply(self, client, message):
+        waiter = self._waiters.get(client.me.id)
+        if waiter and not waiter.done():
+            waiter.set_result(message)
+
+    async def _probe(self, client):
+        user_id = client.me.id
+        if user_id not in self._unblocked:
+            await client.unblock_user(SPAMBOT)
+            self._unblocked.add(user_id)
+        peer = await client.resolve_peer(SPAMBOT)
+        waiter = self._waiters[user_id] = asyncio.get_running_loop().create_future()
+        try:
+            await client.invoke(
+                StartBot(bot=peer, peer=peer, random_id=client.rnd_id(), start_param="start")
+            )
+            try:
+                text = (await asyncio.wait_for(waiter, LIMIT_PROBE_TIMEOUT)).text
+            except asyncio.TimeoutError:
+                # Update bisa terlewat, ambil balasan terakhir dari riwayat chat
+                text = None
+                async for message in client.get_chat_history(SPAMBOT, limit=1):
+                    if not message.outgoing:
+                        text = message.text
+                if not text:
+                    self._unblocked.discard(user_id)
+                    raise
+        finally:
+            self._waiters.pop(user_id, None)
+        try:
+            await client.invoke(DeleteHistory(peer=peer, max_id=0, revoke=True))
+        except Exception:
+            pass
+        status = self._status[user_id] = RestrictionStatus(text)
+        return status
+
+
+RESTRICTION = RestrictionProbe()
+
+
+@ubot.on_message(filters.private & filters.incoming & filters.user(SPAMBOT), group=LIMIT_HANDLER_GROUP)
+async def _(client, message):
+    RESTRICTION.on_reply(client, message)
+
 
-# Fungsi untuk menjalankan limit check sebagai task terpisah
 async def limit_check_task(client):
     try:
-        while client.me.id in LT:
-            for x in range(2):
-                cmd_message = await client.send_message(client.me.id, ".limit")
-                await limit_cmd(client, cmd_message)
-                await asyncio.sleep(5)
-            await asyncio.sleep(1200)  # 20 menit
+        if client.me.id not in LT:
+            return None
+        started = time.monotonic()
+        previous = RESTRICTION.cached(client.me.id, max_age=None)
+        status = await RESTRICTION.get(client, max_age=0)
+        METRICS.inc("limit_check_total", account=client.me.id, path="limit", result="ok")
+        METRICS.observe(
+            "limit_check_duration_seconds", time.monotonic() - started, LATENCY_BUCKETS,
+            account=client.me.id, path="limit",
+        )
+        # Lapor hanya saat status berubah, bukan setiap pengecekan
+        if previous is None or previous.limited != status.limited:
+            await report_status(client, await restriction_text(client, status))
+        return LIMIT_STATUS_TTL
+    except asyncio.TimeoutError:
+        # SpamBot tidak membalas, bukan alasan mematikan cek limit; coba lagi nanti
+        METRICS.inc("limit_check_total", account=client.me.id, path="limit", result="TimeoutError")
+        return LIMIT_STATUS_TTL
     except Exception as e:
+        METRICS.inc("limit_check_total", account=client.me.id, path="limit", result=type(e).__name__)
         print(f"Error in limit_check_task: {e}")
         if client.me.id in LT:
             LT.remove(client.me.id)
-            await set_vars(client.me.id, "AUTO_LIMIT_CHECK_ACTIVE", False)
-
-async def limit_cmd(client, message):
-    ggl = await EMO.GAGAL(client)
-    sks = await EMO.BERHASIL(client)
-    prs = await EMO.PROSES(client)
-    pong = await EMO.PING(client)
-    tion = await EMO.MENTION(client)
-    yubot = await EMO.UBOT(client)
-    await client.unblock_user("SpamBot")
-    bot_info = await client.resolve_peer("SpamBot")
-    msg = await message.reply(f"{prs}processing . . .")
-    response = await client.invoke(
-        StartBot(
-            bot=bot_info,
-            peer=bot_info,
-            random_id=client.rnd_id(),
-            start_param="start",
-        )
-    )
-    await sleep(1)
-    await msg.delete()
-    status = await client.get_messages("SpamBot", response.updates[1].message.id + 1) 
-    if status and hasattr(status, "text"):
-        pjg = len(status.text)
-        print(pjg)
-        if pjg <= 100:
-            if client.me.is_premium:
-                text = f"""
+            await SETTINGS.set(client.me.id, "AUTO_LIMIT_CHECK_ACTIVE", False)
+
+async def restriction_text(client, status):
+    """Pesan status limit akun untuk dikirim ke user"""
+    emo = await get_emo(client)
+    pong = emo.PING
+    tion = emo.MENTION
+    yubot = emo.UBOT
+    if not status.limited:
+        if client.me.is_premium:
+            text = f"""
 <blockquote>{pong} ss   : 
 {tion}   :    s
 {yubot}  : {bot.me.mention}</blockquote>
 """
-            else:
-                text = f"""
+        else:
+            text = f"""
 <blockquote>ss  :    
   :    s
  : {bot.me.mention}</blockquote>
 """
-            await client.send_message(message.chat.id, text)
-            return await client.invoke(DeleteHistory(peer=bot_info, max_id=0, revoke=True))
-        else:
-            if client.me.is_premium:
-                text = f"""
+    else:
+        if client.me.is_premium:
+            text = f"""
 <blockquote>{pong} ss   : 
 {tion}   :   s
 {yubot}  : {bot.me.mention}</blockquote>
 """
-            else:
-                text = f"""
+        else:
+            text = f"""
 <blockquote>ss  :    
   :   s
  : {bot.me.mention}</blockquote>
 """
-            await client.send_message(message.chat.id, text)
-            return await client.invoke(DeleteHistory(peer=bot_info, max_id=0, revoke=True))
-    else:
-        print("Status tidak valid atau status.text tidak ada")
+    if status.until:
+        text += f"<blockquote>{status.until}</blockquote>\n"
+    return text
+
 
 gcast_progress = []
 
 @PY.UBOT("bc|gikes")
 @PY.TOP_CMD
+@PROFILER.track("gikes")
 async def gcast_handler(client, message):
     global gcast_progress
     gcast_progress.append(client.me.id)
     
-    prs = await EMO.PROSES(client)
-    sks = await EMO.BERHASIL(client)
-    ggl = await EMO.GAGAL(client)
-    bcs = await EMO.BROADCAST(client)
-    ktrng = await EMO.BL_KETERANGAN(client)    
+    emo = await get_emo(client)
+    prs = emo.PROSES
+    sks = emo.BERHASIL
+    ggl = emo.GAGAL
+    bcs = emo.BROADCAST
+    ktrng = emo.BL_KETERANGAN
     _msg = f"<b>{prs}ss...</b>"
     gcs = await message.reply(_msg)    
     command, text = extract_type_and_msg(message)
@@ -407,37 +2427,29 @@ async def gcast_handler(client, message):
     if command not in ["group", "users", "all"] or not text:
         gcast_progress.remove(client.me.id)
         return await gcs.edit(f"<blockquote><code>{message.text.split()[0]}</code> <b>[] [x/]</b> {ggl}</blockquote>")
-    chats = await get_data_id(client, command)
-    blacklist = await get_list_from_vars(client.me.id, "BL_ID")
-
-    done = 0
-    failed = 0
-    for chat_id in chats:
-        if client.me.id not in gcast_progress:
-            await gcs.edit(f"<blockquote><b>ss s s   !</b> {sks}</blockquote>")
-            return
-        if chat_id in blacklist or chat_id in BLACKLIST_CHAT:
-            continue
+    chats = await get_chat_ids(client, command)
+    blacklist = await get_blacklist(client)
 
-        try:
-            if message.reply_to_message:
-                # Copy pesan dengan semua atribut termasuk emoji premium
-                await message.reply_to_message.copy(chat_id)
-            else:
-                await client.send_message(chat_id, text)
-            done += 1
-        except FloodWait as e:
-            await asyncio.sleep(e.value)
-            try:
-                if message.reply_to_message:
-                    await text.copy(chat_id)
-                else:
-                    await client.send_message(chat_id, text)
-                done += 1
-            except (Exception, ChannelPrivate):
-                failed += 1
-        except (Exception, ChannelPrivate):
-            failed += 1
+    targets = await DEAD_CHATS.filter(
+        client, filter_blacklisted(client, chats, blacklist, "gcast"), "gcast"
+    )
+
+    async def send(chat_id):
+        if message.reply_to_message:
+            # Copy pesan dengan semua atribut termasuk emoji premium
+            await message.reply_to_message.copy(chat_id)
+        else:
+            await send_parsed_text(client, chat_id, text)
+
+    result = await run_broadcast(
+        client, targets, send, "gcast", stop=lambda: client.me.id not in gcast_progress,
+        track_dead=True,
+    )
+    if result.stopped:
+        await gcs.edit(f"<blockquote><b>ss s s   !</b> {sks}</blockquote>")
+        return
+    done = result.done
+    failed = result.failed
 
     gcast_progress.remove(client.me.id)
     await gcs.delete()
@@ -446,15 +2458,17 @@ async def gcast_handler(client, message):
 <blockquote><b>{sks}s : {done} </b>
 <b>{ggl} : {failed} </b>
 <b>{ktrng} :</b> <code>{command}</code></blockquote>
-
+{retry_report(result)}
 """
     return await message.reply(_gcs)
 
 @PY.UBOT("stopg")
 @PY.TOP_CMD
+@PROFILER.track("stopg")
 async def stopg_handler(client, message):
-    sks = await EMO.BERHASIL(client)
-    ggl = await EMO.GAGAL(client)
+    emo = await get_emo(client)
+    sks = emo.BERHASIL
+    ggl = emo.GAGAL
     global gcast_progress
     if client.me.id in gcast_progress:
         gcast_progress.remove(client.me.id)
@@ -464,11 +2478,13 @@ async def stopg_handler(client, message):
 
 @PY.UBOT("bcfd|cfd")
 @PY.TOP_CMD
+@PROFILER.track("bcfd")
 async def _(client, message):
-    prs = await EMO.PROSES(client)
-    brhsl = await EMO.BERHASIL(client)
-    ggl = await EMO.GAGAL(client)
-    bcs = await EMO.BROADCAST(client)
+    emo = await get_emo(client)
+    prs = emo.PROSES
+    brhsl = emo.BERHASIL
+    ggl = emo.GAGAL
+    bcs = emo.BROADCAST
     
     _msg = f"{prs}proceing..."
     gcs = await message.reply(_msg)
@@ -481,86 +2497,163 @@ async def _(client, message):
     if not message.reply_to_message:
         return await gcs.edit(f"{ggl}{message.text.split()[0]} type [reply]")
 
-    chats = await get_data_id(client, command)
-    blacklist = await get_list_from_vars(client.me.id, "BL_ID")
+    chats = await get_chat_ids(client, command)
+    blacklist = await get_blacklist(client)
 
-    done = 0
-    failed = 0
-    for chat_id in chats:
-        if chat_id in blacklist or chat_id in BLACKLIST_CHAT:
-            continue
+    targets = await DEAD_CHATS.filter(
+        client, filter_blacklisted(client, chats, blacklist, "bcfd"), "bcfd"
+    )
 
-        try:
-            if message.reply_to_message:
-                await message.reply_to_message.forward(chat_id)
-            else:
-                await text.forward(chat_id)
-            done += 1
-        except FloodWait as e:
-            await asyncio.sleep(e.value)
-            if message.reply_to_message:
-                await message.reply_to_message.forward(chat_id)
-            else:
-                await text.forward(chat_id)
-            done += 1
-        except Exception:
-            failed += 1
-            pass
+    async def send(chat_id):
+        if message.reply_to_message:
+            await message.reply_to_message.forward(chat_id)
+        else:
+            await text.forward(chat_id)
+
+    result = await run_broadcast(client, targets, send, "bcfd", track_dead=True)
+    done = result.done
+    failed = result.failed
 
     await gcs.delete()
     _gcs = f"""
 <blockquote><b>{bcs}s  </blockquote></b>
 <blockquote><b>{brhsl} ss {done} </b>
 <b>{ggl}  {failed} </blockquote></b>
-
+{retry_report(result)}
 """
     return await message.reply(_gcs)
 
 
+# bcast dikirim per halaman; posisi disimpan di vars BCAST_CURSOR milik bot:
+# {"source": {"chat_id", "message_id"} atau {"text"}, "pos": jumlah user yang sudah dilayani,
+#  "last": user terakhir yang dilayani, "done": terkirim, "failed": gagal}
+BCAST_PAGE_SIZE = 500  # user per halaman
+BCAST_CHECKPOINT_EVERY = 50  # simpan cursor setiap N user yang sudah selesai
+BCAST_PROGRESS_INTERVAL = 30  # detik antar update progres
+
+
+async def bcast_saved_users(client, msg, send, cursor):
+    """Kirim send (pesan untuk di-forward atau teks) ke SAVED_USERS mulai dari cursor"""
+    users = await get_list_from_vars(client.me.id, "SAVED_USERS")
+    start = cursor["pos"]
+    # Daftar bisa berubah sejak terputus, cari lagi posisi user terakhir
+    if cursor["last"] is not None and users[start - 1:start] != [cursor["last"]]:
+        start = users.index(cursor["last"]) + 1 if cursor["last"] in users else start
+    total = BroadcastResult()
+    total.done, total.failed = cursor["done"], cursor["failed"]
+    last_update = time.monotonic()
+    saved = {"pos": start}
+
+    async def send_to_user(chat_id):
+        if isinstance(send, str):
+            await send_parsed_text(client, chat_id, send)
+        else:
+            await send.forward(chat_id)
+
+    for offset in range(start, len(users), BCAST_PAGE_SIZE):
+        page = users[offset:offset + BCAST_PAGE_SIZE]
+
+        async def progress(count):
+            nonlocal last_update
+            # Simpan posisi setiap BCAST_CHECKPOINT_EVERY user; done/failed halaman ini
+            # baru diketahui setelah run_broadcast selesai, jadi yang disimpan rekap halaman sebelumnya
+            if offset + count - saved["pos"] >= BCAST_CHECKPOINT_EVERY:
+                saved["pos"] = offset + count
+                cursor.update(pos=offset + count, last=page[count - 1], done=total.done, failed=total.failed)
+                await SETTINGS.set(client.me.id, "BCAST_CURSOR", cursor)
+            if time.monotonic() - last_update < BCAST_PROGRESS_INTERVAL:
+                return
+            last_update = time.monotonic()
+            try:
+                await msg.edit(
+                    f"<blockquote><b>Broadcast berjalan: {offset + count}/{len(users)} user</b></blockquote>"
+                )
+            except Exception:
+                pass
+
+        result = await run_broadcast(client, page, send_to_user, "bcast", on_progress=progress)
+        total.merge(result)
+        saved["pos"] = offset + len(page)
+        cursor.update(pos=offset + len(page), last=page[-1], done=total.done, failed=total.failed)
+        await SETTINGS.set(client.me.id, "BCAST_CURSOR", cursor)
+
+    await SETTINGS.set(client.me.id, "BCAST_CURSOR", None)
+    return total
+
+
 @PY.BOT("bcast")
 @PY.ADMIN
+@PROFILER.track("bcast")
 async def _(client, message):
     msg = await message.reply("<blockquote><b>okee proses Boy...</blockquote></b>\n\n<blockquote><b>mohon bersabar untuk menunggu proses broadcast sampai selesai</blockquote></b>", quote=True)
 
-    send = get_message(message)
-    if not send:
-        return await msg.edit("mohon bala atau ketik euatu...")
-        
-    susers = await get_list_from_vars(client.me.id, "SAVED_USERS")
-    done = 0
-    for chat_id in susers:
-        try:
-            if message.reply_to_message:
-                await send.forward(chat_id)
-            else:
-                await client.send_message(chat_id, send)
-            done += 1
-        except FloodWait as e:
-            await asyncio.sleep(e.value)
-            if message.reply_to_message:
-                await send.forward(chat_id)
-            else:
-                await client.send_message(chat_id, send)
-            done += 1
-        except Exception:
-            pass
+    if not message.reply_to_message and get_arg(message) == "resume":
+        # Lanjutkan broadcast yang terputus dari cursor terakhir
+        cursor = await SETTINGS.get(client.me.id, "BCAST_CURSOR")
+        if not cursor:
+            return await msg.edit("<blockquote><b>tidak ada broadcast yang terputus</b></blockquote>")
+        source = cursor["source"]
+        if "text" in source:
+            send = source["text"]
+        else:
+            send = await client.get_messages(source["chat_id"], source["message_id"])
+            if not send or send.empty:
+                await SETTINGS.set(client.me.id, "BCAST_CURSOR", None)
+                return await msg.edit("<blockquote><b>pesan broadcast sudah tidak ada</b></blockquote>")
+    else:
+        send = get_message(message)
+        if not send:
+            return await msg.edit("mohon bala atau ketik euatu...")
+        if message.reply_to_message:
+            source = {"chat_id": message.chat.id, "message_id": message.reply_to_message.id}
+        else:
+            source = {"text": send}
+        cursor = {"source": source, "pos": 0, "last": None, "done": 0, "failed": 0}
+        await SETTINGS.set(client.me.id, "BCAST_CURSOR", cursor)
+
+    try:
+        result = await bcast_saved_users(client, msg, send, cursor)
+    except Exception as e:
+        print(f"Error in bcast: {e}")
+        return await msg.edit(
+            f"<blockquote><b>Broadcast terhenti: {e}</b></blockquote>\n"
+            f"<blockquote><b>lanjutkan dengan</b> <code>{message.text.split()[0]} resume</code></blockquote>"
+        )
+    done = result.done
 
-    return await msg.edit(f"<blockquote><b>Pesan broadcast berhasil terkirim ke {done} user</blockquote></b>\n\n<blockquote><b>`USERBOT 5k/BULAN BY` @ElainaUserbot</b></blockquote>")
+    return await msg.edit(f"<blockquote><b>Pesan broadcast berhasil terkirim ke {done} user</blockquote></b>\n{retry_report(result)}\n<blockquote><b>`USERBOT 5k/BULAN BY` @ElainaUserbot</b></blockquote>")
 
 
 @PY.UBOT("addbl")
 @PY.TOP_CMD
 @PY.GROUP
+@PROFILER.track("addbl")
 async def _(client, message):
-    prs = await EMO.PROSES(client)
-    grp = await EMO.BL_GROUP(client)
-    ktrn = await EMO.BL_KETERANGAN(client)
+    emo = await get_emo(client)
+    prs = emo.PROSES
+    grp = emo.BL_GROUP
+    ktrn = emo.BL_KETERANGAN
+    ggl = emo.GAGAL
     _msg = f"{prs}proceing..."
 
     msg = await message.reply(_msg)
     try:
+        chat_ids = parse_chat_ids(message.command[1:])
+        if len(message.command) > 1 and not chat_ids:
+            # Ada argumen tapi tidak ada ID yang valid, jangan jatuh ke chat saat ini
+            return await msg.edit(
+                f"<blockquote><b>{ggl}{message.text.split()[0]} [chat_id ...]</b></blockquote>"
+            )
+        if chat_ids:
+            # Banyak ID sekaligus, disimpan dalam satu kali tulis
+            added = await SETTINGS.add_many_to_list(client.me.id, "BL_ID", chat_ids)
+            return await msg.edit(
+                f"<blockquote><b>{ktrn} : {added} chat ditambahkan ke Blacklist, "
+                f"{len(set(chat_ids)) - added} sudah ada</b></blockquote>"
+            )
+
         chat_id = message.chat.id
-        blacklist = await get_list_from_vars(client.me.id, "BL_ID")
+        blacklist = await SETTINGS.get_list(client.me.id, "BL_ID")
 
         if chat_id in blacklist:
             txt = f"""
@@ -570,7 +2663,7 @@ async def _(client, message):
 <blockquote><b>USERBOT 5k/BULAN BY @ElainaUserbot</b></blockquote>
 """
         else:
-            await add_to_vars(client.me.id, "BL_ID", chat_id)
+            await SETTINGS.add_to_list(client.me.id, "BL_ID", chat_id)
             txt = f"""
 <blockquote><b>{grp} : {message.chat.title}</blockquote></b>\n<blockquote><b>{ktrn} : s     s Blacklist</blockquote></b>
 
@@ -585,16 +2678,33 @@ async def _(client, message):
 @PY.UBOT("unbl")
 @PY.TOP_CMD
 @PY.GROUP
+@PROFILER.track("unbl")
 async def _(client, message):
-    prs = await EMO.PROSES(client)
-    grp = await EMO.BL_GROUP(client)
-    ktrn = await EMO.BL_KETERANGAN(client)
+    emo = await get_emo(client)
+    prs = emo.PROSES
+    grp = emo.BL_GROUP
+    ktrn = emo.BL_KETERANGAN
+    ggl = emo.GAGAL
     _msg = f"{prs}proceing..."
 
     msg = await message.reply(_msg)
     try:
-        chat_id = get_arg(message) or message.chat.id
-        blacklist = await get_list_from_vars(client.me.id, "BL_ID")
+        chat_ids = parse_chat_ids(message.command[1:])
+        if len(message.command) > 1 and not chat_ids:
+            # Ada argumen tapi tidak ada ID yang valid, jangan jatuh ke chat saat ini
+            return await msg.edit(
+                f"<blockquote><b>{ggl}{message.text.split()[0]} [chat_id ...]</b></blockquote>"
+            )
+        if chat_ids:
+            # Banyak ID sekaligus, disimpan dalam satu kali tulis
+            removed = await SETTINGS.remove_many_from_list(client.me.id, "BL_ID", chat_ids)
+            return await msg.edit(
+                f"<blockquote><b>{ktrn} : {removed} chat dihapus dari Blacklist, "
+                f"{len(set(chat_ids)) - removed} tidak ditemukan</b></blockquote>"
+            )
+
+        chat_id = message.chat.id
+        blacklist = await SETTINGS.get_list(client.me.id, "BL_ID")
 
         if chat_id not in blacklist:
             response = f"""
@@ -604,7 +2714,7 @@ async def _(client, message):
 <blockquote><b>USERBOT 5k/BULAN BY @ElainaUserbot</b></blockquote>
 """
         else:
-            await remove_from_vars(client.me.id, "BL_ID", chat_id)
+            await SETTINGS.remove_from_list(client.me.id, "BL_ID", chat_id)
             response = f"""
 <blockquote><b>{grp} : {message.chat.title}</blockquote ></b>
 <blockquote><b>{ktrn} : s  s   s Blacklist</blockquote></b>
@@ -619,14 +2729,16 @@ async def _(client, message):
 # Perbaikan untuk fungsi listbl pada broadcast.py
 @PY.UBOT("listbl")
 @PY.TOP_CMD
+@PROFILER.track("listbl")
 async def _(client, message):
-    prs = await EMO.PROSES(client)
-    brhsl = await EMO.BERHASIL(client)
-    ktrng = await EMO.BL_KETERANGAN(client)
+    emo = await get_emo(client)
+    prs = emo.PROSES
+    brhsl = emo.BERHASIL
+    ktrng = emo.BL_KETERANGAN
     _msg = f"{prs}proceꜱꜱing..."
     mzg = await message.reply(_msg)
 
-    blacklist = await get_list_from_vars(client.me.id, "BL_ID")
+    blacklist = await SETTINGS.get_list(client.me.id, "BL_ID")
     total_blacklist = len(blacklist)
 
     list_text = f"{brhsl} daftar blackliꜱt\n"
@@ -643,26 +2755,28 @@ async def _(client, message):
 
 @PY.UBOT("rallbl")
 @PY.TOP_CMD
+@PROFILER.track("rallbl")
 async def _(client, message):
-    prs = await EMO.PROSES(client)
-    ggl = await EMO.GAGAL(client)
-    brhsl = await EMO.BERHASIL(client)
+    emo = await get_emo(client)
+    prs = emo.PROSES
+    ggl = emo.GAGAL
+    brhsl = emo.BERHASIL
     _msg = f"{prs}proceing..."
 
     msg = await message.reply(_msg)
-    blacklists = await get_list_from_vars(client.me.id, "BL_ID")
+    blacklists = await SETTINGS.get_list(client.me.id, "BL_ID")
 
     if not blacklists:
         return await msg.edit(f"{ggl}blacklit broadcat anda koong")
 
-    for chat_id in blacklists:
-        await remove_from_vars(client.me.id, "BL_ID", chat_id)
+    await SETTINGS.clear_list(client.me.id, "BL_ID")
 
     await msg.edit(f"{brhsl}emua blacklit broadcat berhail di hapu")
 
 
 @PY.UBOT("send")
 @PY.TOP_CMD
+@PROFILER.track("send")
 async def _(client, message):
     if message.reply_to_message:
         chat_id = (
@@ -672,7 +2786,7 @@ async def _(client, message):
             if client.me.id != bot.me.id:
                 if message.reply_to_message.reply_markup:
                     x = await client.get_inline_bot_results(
-                        bot.me.username, f"get_send {id(message)}"
+                        bot.me.username, f"get_send {SEND_REGISTRY.register(message)}"
                     )
                     return await client.send_inline_bot_result(
                         chat_id, x.query_id, x.results[0].id
@@ -703,20 +2817,20 @@ async def _(client, message):
 
 
 @PY.INLINE("^get_send")
+@PROFILER.track("get_send")
 async def _(client, inline_query):
-    _id = int(inline_query.query.split()[1])
-    m = next((obj for obj in get_objects() if id(obj) == _id), None)
-    if m:
+    query = inline_query.query.split()
+    found = await lookup_send(inline_query.from_user.id, query[1]) if len(query) > 1 else None
+    if found:
+        text, reply_markup = found
         await client.answer_inline_query(
             inline_query.id,
             cache_time=0,
             results=[
                 InlineQueryResultArticle(
                     title="get send!",
-                    reply_markup=m.reply_to_message.reply_markup,
-                    input_message_content=InputTextMessageContent(
-                        m.reply_to_message.text
-                    ),
+                    reply_markup=reply_markup,
+                    input_message_content=InputTextMessageContent(text),
                 )
             ],
         )
@@ -750,13 +2864,15 @@ async def send_premium_message(client, chat_id, text, reply_to=None):
 # Command handler untuk autobc
 @PY.UBOT("autobc")
 @PY.TOP_CMD
+@PROFILER.track("autobc", subcommand=True)
 async def _(client, message):
     global AG, LT, timer_checker_users
-    prs = await EMO.PROSES(client)
-    brhsl = await EMO.BERHASIL(client)
-    bcs = await EMO.BROADCAST(client)
-    mng = await EMO.MENUNGGU(client)
-    ggl = await EMO.GAGAL(client)   
+    emo = await get_emo(client)
+    prs = emo.PROSES
+    brhsl = emo.BERHASIL
+    bcs = emo.BROADCAST
+    mng = emo.MENUNGGU
+    ggl = emo.GAGAL
     msg = await message.reply(f"{prs}proceꜱꜱing...")
     
     command_parts = message.text.split()
@@ -771,12 +2887,12 @@ async def _(client, message):
     value = " ".join(command_parts[2:]) if len(command_parts) > 2 else ""
     
     # Get current auto_text settings
-    auto_text_vars = await get_vars(client.me.id, "AUTO_TEXT") or {}
+    auto_text_vars = await SETTINGS.get(client.me.id, "AUTO_TEXT") or {}
     
     # Convert to new format if needed
     if isinstance(auto_text_vars, list):  # Perbaikan: menggunakan lowercase list
         auto_text_vars = {"default": auto_text_vars}
-        await set_vars(client.me.id, "AUTO_TEXT", auto_text_vars)
+        await SETTINGS.set(client.me.id, "AUTO_TEXT", auto_text_vars)
     
     if command == "on":
         if not auto_text_vars or not any(auto_text_vars.values()):
@@ -788,27 +2904,28 @@ async def _(client, message):
         forward_mode = False
         if value and value.lower() == "forward":
             forward_mode = True
-            await set_vars(client.me.id, "AUTOBC_FORWARD_MODE", True)
+            await SETTINGS.set(client.me.id, "AUTOBC_FORWARD_MODE", True)
         else:
-            await set_vars(client.me.id, "AUTOBC_FORWARD_MODE", False)
+            await SETTINGS.set(client.me.id, "AUTOBC_FORWARD_MODE", False)
 
         if client.me.id not in AG:
             # Set flag di database bahwa autobc aktif
-            await set_vars(client.me.id, "AUTO_GCAST_ACTIVE", True)
+            await SETTINGS.set(client.me.id, "AUTO_GCAST_ACTIVE", True)
             mode_text = "FORWARD" if forward_mode else "COPY"
             await msg.edit(f"{brhsl}auto gcat di aktifkan (Mode: {mode_text})")
             
             AG.append(client.me.id)
             # Jalankan autobc task di background
-            asyncio.create_task(autobc_task(client))
+            start_autobc(client)
         else:
             return await msg.delete()
 
     elif command == "off":
         if client.me.id in AG:
             AG.remove(client.me.id)
+            SCHEDULER.cancel(("autobc", client.me.id))
             # Set flag di database bahwa autobc nonaktif
-            await set_vars(client.me.id, "AUTO_GCAST_ACTIVE", False)
+            await SETTINGS.set(client.me.id, "AUTO_GCAST_ACTIVE", False)
             return await msg.edit(f"{brhsl}auto gcast dinonaktifkan")
         else:
             return await msg.delete()
@@ -836,12 +2953,12 @@ async def _(client, message):
                 "start_time": f"{start_hours:02d}:{start_minutes:02d}",
                 "end_time": f"{end_hours:02d}:{end_minutes:02d}"
             }
-            await set_vars(client.me.id, "AUTOBC_TIMER", timer_settings)
+            await SETTINGS.set(client.me.id, "AUTOBC_TIMER", timer_settings)
             
-            # Mulai timer checker task jika belum berjalan
+            # Mulai timer checker, atau hitung ulang transisi bila sudah berjalan
             if client.me.id not in timer_checker_users:
                 timer_checker_users.append(client.me.id)
-                asyncio.create_task(timer_checker_task(client))
+            start_timer_checker(client)
             
             return await msg.edit(
                 f"{brhsl}Timer auto broadcast berhasil diatur dari {start_time} sampai {end_time}"
@@ -850,18 +2967,19 @@ async def _(client, message):
             return await msg.edit(f"{ggl}Error: {str(e)}")
             
     elif command == "timer_off":
-        timer_settings = await get_vars(client.me.id, "AUTOBC_TIMER") or {}
+        timer_settings = await SETTINGS.get(client.me.id, "AUTOBC_TIMER") or {}
         if timer_settings:
             timer_settings["enabled"] = False
-            await set_vars(client.me.id, "AUTOBC_TIMER", timer_settings)
+            await SETTINGS.set(client.me.id, "AUTOBC_TIMER", timer_settings)
             if client.me.id in timer_checker_users:
                 timer_checker_users.remove(client.me.id)
+                SCHEDULER.cancel(("timer", client.me.id))
             return await msg.edit(f"{brhsl}Timer auto broadcast dinonaktifkan")
         else:
             return await msg.edit(f"{ggl}Timer belum diatur")
             
     elif command == "timer_status":
-        timer_settings = await get_vars(client.me.id, "AUTOBC_TIMER") or {}
+        timer_settings = await SETTINGS.get(client.me.id, "AUTOBC_TIMER") or {}
         if not timer_settings:
             return await msg.edit(f"{ggl}Timer belum diatur")
             
@@ -917,7 +3035,7 @@ async def _(client, message):
             return await msg.edit(
                 f"{ggl}{message.text.split()[0]} delay - [value]"
             )
-        await set_vars(client.me.id, "DELAY_GCAST", value)
+        await SETTINGS.set(client.me.id, "DELAY_GCAST", value)
         return await msg.edit(
             f"{brhsl}barhasil ke setting {value} menit"
         )
@@ -941,16 +3059,16 @@ async def _(client, message):
             if target_key == "default" and len(auto_text_vars) > 1:
                 # Hanya hapus pesan default, bukan semua grup
                 auto_text_vars["default"] = []
-                await set_vars(client.me.id, "AUTO_TEXT", auto_text_vars)
+                await SETTINGS.set(client.me.id, "AUTO_TEXT", auto_text_vars)
                 return await msg.edit(f"{brhsl}semua pesan default berhasil dihapus")
             elif target_key == "all":
                 # Hapus semua pesan dari semua grup
-                await set_vars(client.me.id, "AUTO_TEXT", {})
+                await SETTINGS.set(client.me.id, "AUTO_TEXT", {})
                 return await msg.edit(f"{brhsl}semua pesan autobc berhasil dihapus")
             else:
                 # Hapus pesan dari grup tertentu
                 auto_text_vars.pop(target_key, None)
-                await set_vars(client.me.id, "AUTO_TEXT", auto_text_vars)
+                await SETTINGS.set(client.me.id, "AUTO_TEXT", auto_text_vars)
                 return await msg.edit(f"{brhsl}semua pesan untuk grup {target_key} berhasil dihapus")
         
         try:
@@ -963,7 +3081,7 @@ async def _(client, message):
                 if not auto_text_vars[target_key] and target_key != "default":
                     auto_text_vars.pop(target_key)
                 
-                await set_vars(client.me.id, "AUTO_TEXT", auto_text_vars)
+                await SETTINGS.set(client.me.id, "AUTO_TEXT", auto_text_vars)
                 
                 group_text = "default" if target_key == "default" else f"grup {target_key}"
                 return await msg.edit(
@@ -1049,12 +3167,234 @@ async def _(client, message):
         txt += f"\nUntuk menghapus pesan:\n{message.text.split()[0]} remove[:group_id] [index/all]"
         return await msg.edit(txt)
 
+    elif command == "engine":
+        # Format: autobc engine [konkurensi] [pesan_per_detik]
+        engine = await get_send_engine(client)
+        if value:
+            try:
+                parts = value.split()
+                concurrency = int(parts[0])
+                rate = float(parts[1]) if len(parts) > 1 else engine.rate
+                if concurrency < 1 or rate <= 0:
+                    raise ValueError
+            except ValueError:
+                return await msg.edit(
+                    f"{ggl}{message.text.split()[0]} engine [konkurensi] [pesan_per_detik]"
+                )
+            engine.configure(concurrency, rate)
+            await SETTINGS.set(
+                client.me.id, "SEND_ENGINE", {"concurrency": concurrency, "rate": rate}
+            )
+        return await msg.edit(
+            f"{brhsl}Engine pengiriman:\n"
+            f" Konkurensi: {engine.concurrency}\n"
+            f" Laju: {engine.rate} pesan/detik"
+        )
+
+    elif command == "plan":
+        plan = await plan_autobc(client)
+        minutes, seconds = divmod(int(plan["estimate"]), 60)
+        txt = f"{bcs}Rencana putaran autobc (tanpa mengirim):\n"
+        txt += f" Mode: {plan['mode']}\n"
+        txt += f" Putaran: {plan['resume_round']}\n"
+        txt += f" Grup: {plan['groups']}\n"
+        txt += f" Dilewati (blacklist): {plan['blacklisted']}\n"
+        if plan["dead"]:
+            txt += f" Dilewati (chat mati): {plan['dead']}\n"
+        if plan["already_sent"]:
+            txt += f" Sudah terkirim (checkpoint): {plan['already_sent']}\n"
+        txt += f" Tanpa pesan: {plan['no_message']}\n"
+        if plan["unavailable"]:
+            txt += f" Pesan sumber tidak tersedia: {plan['unavailable']}\n"
+        if plan["missing_refs"]:
+            txt += f" Ref hilang (akan dihapus): {plan['missing_refs']}\n"
+        txt += f" Akan dikirim: {plan['targets']}\n"
+        for kind, count in sorted(plan["pools"].items()):
+            txt += f"   - {kind}: {count} grup\n"
+        txt += f" Perkiraan durasi: {minutes} menit {seconds} detik\n"
+        if plan["restriction"] and plan["restriction"].limited:
+            txt += " Akun sedang dibatasi SpamBot (cek limit terakhir)\n"
+        engine = await get_send_engine(client)
+        txt += f" (engine {engine.concurrency} paralel, {engine.rate} pesan/detik"
+        if plan["latency"]:
+            txt += f", latensi rata-rata {plan['latency']:.2f} detik"
+        txt += ")\n"
+        if plan["sample"]:
+            txt += "\nDetail grup (max 10):\n"
+            for i, (title, kind, count) in enumerate(plan["sample"], 1):
+                txt += f"{i}. {title} - {kind} (acak dari {count} pesan)\n"
+            if plan["targets"] > len(plan["sample"]):
+                txt += f"...dan {plan['targets'] - len(plan['sample'])} grup lainnya\n"
+        return await msg.edit(txt)
+
+    elif command == "report":
+        # Format: autobc report [each/digest/pin] [menit]
+        config = await SETTINGS.get(client.me.id, "AUTOBC_REPORT") or {}
+        parts = value.lower().split()
+        if parts:
+            mode = parts[0]
+            try:
+                interval = int(parts[1]) if len(parts) > 1 else config.get("interval", DIGEST_INTERVAL)
+                if mode not in ("each", "digest", "pin") or interval < 1:
+                    raise ValueError
+            except ValueError:
+                return await msg.edit(
+                    f"{ggl}{message.text.split()[0]} report [each/digest/pin] [menit]"
+                )
+            config.update(mode=mode, interval=interval)
+            await SETTINGS.set(client.me.id, "AUTOBC_REPORT", config)
+            if mode == "each":
+                # Kirim sisa ringkasan yang masih tertunda
+                await flush_status_digest(client)
+                SCHEDULER.cancel(("digest", client.me.id))
+        mode = config.get("mode", "each")
+        txt = f"{brhsl}Laporan autobc: {mode.upper()}"
+        if mode != "each":
+            txt += f" (ringkasan setiap {config.get('interval', DIGEST_INTERVAL)} menit)"
+        return await msg.edit(txt)
+
+    elif command == "dead":
+        # Format: autobc dead [reset] [chat_id]
+        parts = value.split()
+        if parts and parts[0].lower() == "reset":
+            try:
+                chat_id = int(parts[1]) if len(parts) > 1 else None
+            except ValueError:
+                return await msg.edit(f"{ggl}{message.text.split()[0]} dead reset [chat_id]")
+            removed = await DEAD_CHATS.reset(client.me.id, chat_id)
+            return await msg.edit(f"{brhsl}{removed} chat dihapus dari daftar chat mati")
+        items = await DEAD_CHATS.items(client.me.id)
+        if not items:
+            return await msg.edit(f"{brhsl}Tidak ada chat mati yang tercatat")
+        now = time.time()
+        txt = f"{bcs}Chat mati ({len(items)}), max 20:\n"
+        for chat_id, entry in items[:20]:
+            until = DEAD_CHATS.blocked_until(entry)
+            errors = ", ".join(f"{name} x{error['failures']}" for name, error in entry.items())
+            if until > now:
+                status = f"dilewati {int((until - now) // 60)} menit lagi"
+            else:
+                status = "dicoba lagi putaran berikutnya"
+            txt += f"\n<code>{chat_id}</code> - {errors} - {status}"
+        txt += f"\n\nReset: {message.text.split()[0]} dead reset [chat_id]"
+        return await msg.edit(txt)
+
+    elif command == "shards":
+        if SHARD_COUNT == 1:
+            return await msg.edit(f"{brhsl}Sharding nonaktif, semua akun di satu proses")
+        healths = {SHARD_INDEX: shard_health(), **await other_shards({"cmd": "health"})}
+        txt = f"{bcs}Shard ({SHARD_COUNT} worker):\n"
+        for index in range(SHARD_COUNT):
+            health = healths.get(index)
+            if not health or "error" in health:
+                txt += f"\n#{index}: tidak merespons\n"
+                continue
+            scheduler = health["scheduler"]
+            txt += (
+                f"\n#{index} pid {health['pid']}, aktif {int(health['uptime'] // 60)} menit\n"
+                f" akun {health['clients']}, autobc {health['autobc']}, gikes {health['gcast']}\n"
+                f" job {scheduler['jobs']}, task {health['tasks']}, "
+                f"telat maks {scheduler['max_lateness']:.2f} detik\n"
+            )
+        return await msg.edit(txt)
+
+    elif command == "stats":
+        summary = METRICS.account_summary(client.me.id)
+        txt = f"{bcs}Statistik broadcast akun ini:\n"
+        if not summary:
+            txt += "\nBelum ada data broadcast untuk akun ini\n"
+        for path, entry in sorted(summary.items()):
+            txt += f"\n{path.upper()}:\n"
+            if path != "limit":
+                txt += f" Terkirim: {entry.get('broadcast_sent_total', 0)}\n"
+                txt += f" Gagal: {entry.get('broadcast_failed_total', 0)}\n"
+                for error, count in sorted(entry["errors"].items(), key=lambda item: -item[1])[:5]:
+                    txt += f"   - {error}: {count}\n"
+                txt += f" FloodWait: {entry.get('broadcast_floodwait_seconds_total', 0)} detik\n"
+                txt += f" Dilewati (blacklist): {entry.get('broadcast_skipped_blacklist_total', 0)}\n"
+                if "broadcast_skipped_dead_total" in entry:
+                    txt += f" Dilewati (chat mati): {entry['broadcast_skipped_dead_total']}\n"
+            if "broadcast_send_latency_seconds" in entry:
+                txt += f" Rata-rata latensi kirim: {entry['broadcast_send_latency_seconds']:.2f} detik\n"
+            if "broadcast_round_duration_seconds" in entry:
+                txt += f" Rata-rata durasi putaran: {entry['broadcast_round_duration_seconds']:.1f} detik\n"
+            if "limit_check_total" in entry:
+                txt += f" Cek limit: {entry['limit_check_total']} kali\n"
+            if "limit_check_duration_seconds" in entry:
+                txt += f" Rata-rata durasi cek limit: {entry['limit_check_duration_seconds']:.1f} detik\n"
+        # Antrean scheduler dipakai bersama semua akun di proses ini
+        scheduler = SCHEDULER.stats()
+        txt += (
+            f"\nScheduler (semua akun):\n"
+            f" Job: {scheduler['jobs']} ({scheduler['running']} berjalan, {scheduler['overdue']} jatuh tempo)\n"
+            f" Keterlambatan: rata-rata {scheduler['avg_lateness']:.2f} detik, "
+            f"maks {scheduler['max_lateness']:.2f} detik dari {scheduler['runs']} eksekusi\n"
+        )
+        registry = SEND_REGISTRY.stats()
+        txt += (
+            f"Registry send: {registry['size']} pesan, {registry['hits']} hit, {registry['misses']} miss, "
+            f"{registry['expired']} kedaluwarsa, {registry['evicted']} dibuang\n"
+        )
+        return await msg.edit(txt)
+
+    elif command == "profile":
+        # Format: autobc profile [on/off/reset/nama_perintah]
+        if value in ("on", "off", "reset"):
+            if value == "on":
+                PROFILER.enable()
+            elif value == "off":
+                PROFILER.disable()
+            else:
+                PROFILER.reset()
+            return await msg.edit(f"{brhsl}Profil handler: {value}")
+        status = "aktif" if PROFILER.enabled else "nonaktif"
+        if value:
+            entry = PROFILER.stats.get(value.lower())
+            if not entry:
+                return await msg.edit(f"{ggl}Belum ada data profil untuk {value}")
+            count = entry["count"]
+            txt = f"{bcs}Profil {value.lower()} ({count} kali):\n"
+            txt += f" Rata-rata total: {entry['wall'] / count:.3f} detik\n"
+            txt += f" Rata-rata Telegram: {entry['telegram'] / count:.3f} detik\n"
+            txt += f" Rata-rata database: {entry['db'] / count:.3f} detik\n"
+            txt += f" Terlama: {entry['max']:.3f} detik\n"
+            calls = PROFILER.slowest_calls(value.lower())
+        else:
+            summary = PROFILER.summary()
+            if not summary:
+                return await msg.edit(f"{ggl}Belum ada data profil (status: {status})")
+            txt = f"{bcs}Profil handler (status: {status}):\n"
+            for name, entry in summary:
+                count = entry["count"]
+                txt += (
+                    f"\n{name}: {count}x, rata-rata {entry['wall'] / count:.3f}s"
+                    f" (tg {entry['telegram'] / count:.3f}s, db {entry['db'] / count:.3f}s)"
+                    f", terlama {entry['max']:.3f}s"
+                )
+            txt += "\n"
+            calls = PROFILER.slowest_calls()
+        txt += "\nPemanggilan terlama:\n"
+        for profile in calls:
+            started = dt.datetime.fromtimestamp(profile.started).strftime("%d/%m %H:%M:%S")
+            txt += (
+                f" {started} {profile.command} [{profile.user_id}]: {profile.wall:.3f}s"
+                f" (tg {profile.telegram:.3f}s, db {profile.db:.3f}s)\n"
+            )
+        return await msg.edit(txt)
+
+    elif command == "reload":
+        # Muat ulang pengaturan dan emoji, misalnya setelah mengubah emoji
+        SETTINGS.invalidate(client.me.id)
+        invalidate_emo(client.me.id)
+        return await msg.edit(f"{brhsl}pengaturan dan emoji autobc dimuat ulang")
+
     elif command == "limit":
         if value == "off":
             if client.me.id in LT:
                 LT.remove(client.me.id)
+                SCHEDULER.cancel(("limit", client.me.id))
                 # Set flag di database bahwa limit check nonaktif
-                await set_vars(client.me.id, "AUTO_LIMIT_CHECK_ACTIVE", False)
+                await SETTINGS.set(client.me.id, "AUTO_LIMIT_CHECK_ACTIVE", False)
                 return await msg.edit(f"{brhsl}auto cek limit dinonaktifkan")
             else:
                 return await msg.delete()
@@ -1062,25 +3402,38 @@ async def _(client, message):
         elif value == "on":
             if client.me.id not in LT:
                 # Set flag di database bahwa limit check aktif
-                await set_vars(client.me.id, "AUTO_LIMIT_CHECK_ACTIVE", True)
+                await SETTINGS.set(client.me.id, "AUTO_LIMIT_CHECK_ACTIVE", True)
                 LT.append(client.me.id)
                 await msg.edit(f"{brhsl}auto cek limit started")
                 # Jalankan limit check task di background
-                asyncio.create_task(limit_check_task(client))
+                start_limit_check(client)
             else:
                 return await msg.delete()
+        elif value == "status":
+            # Pakai hasil cek terakhir bila masih baru, kalau tidak cek ke SpamBot
+            try:
+                status = await RESTRICTION.get(client)
+            except asyncio.TimeoutError:
+                # SpamBot tidak membalas, tampilkan hasil cek terakhir bila ada
+                status = RESTRICTION.cached(client.me.id, max_age=None)
+                if status is None:
+                    return await msg.edit(f"{ggl}SpamBot tidak membalas, coba lagi nanti")
+            except Exception as e:
+                return await msg.edit(f"{ggl}{e}")
+            text = await restriction_text(client, status)
+            return await msg.edit(f"{text}\ndicek {int(status.age // 60)} menit lalu")
         else:
              return await msg.edit(f"{ggl}{message.text.split()[0]} limit - [value]")
 
     elif command == "mode":
         if value and value.lower() == "forward":
-            await set_vars(client.me.id, "AUTOBC_FORWARD_MODE", True)
+            await SETTINGS.set(client.me.id, "AUTOBC_FORWARD_MODE", True)
             return await msg.edit(f"{brhsl}Mode autobc diubah ke FORWARD")
         elif value and value.lower() == "copy":
-            await set_vars(client.me.id, "AUTOBC_FORWARD_MODE", False)
+            await SETTINGS.set(client.me.id, "AUTOBC_FORWARD_MODE", False)
             return await msg.edit(f"{brhsl}Mode autobc diubah ke COPY (dengan dukungan emoji premium)")
         else:
-            current_mode = await get_vars(client.me.id, "AUTOBC_FORWARD_MODE") or False
+            current_mode = await SETTINGS.get(client.me.id, "AUTOBC_FORWARD_MODE") or False
             mode_text = "FORWARD" if current_mode else "COPY"
             return await msg.edit(f"{brhsl}Mode autobc saat ini: {mode_text}\n\nUntuk mengubah mode: {message.text.split()[0]} mode [forward/copy]")
 
@@ -1127,20 +3480,28 @@ async def _(client, message):
         usage += f" {message.text.split()[0]} timer [HH:MM-HH:MM] - Atur jadwal aktif otomatis\n"
         usage += f" {message.text.split()[0]} timer_off - Nonaktifkan timer\n"
         usage += f" {message.text.split()[0]} timer_status - Cek status timer\n"
-        usage += f" {message.text.split()[0]} limit [on/off] - Aktifkan/nonaktifkan cek limit"
+        usage += f" {message.text.split()[0]} limit [on/off/status] - Cek limit otomatis / status terakhir\n"
+        usage += f" {message.text.split()[0]} engine [konkurensi] [pesan/detik] - Atur engine pengiriman\n"
+        usage += f" {message.text.split()[0]} plan - Simulasi putaran tanpa mengirim\n"
+        usage += f" {message.text.split()[0]} report [each/digest/pin] [menit] - Atur laporan putaran\n"
+        usage += f" {message.text.split()[0]} stats - Lihat statistik broadcast\n"
+        usage += f" {message.text.split()[0]} shards - Lihat kesehatan worker shard\n"
+        usage += f" {message.text.split()[0]} dead [reset] [chat_id] - Lihat/reset chat yang terus gagal\n"
+        usage += f" {message.text.split()[0]} profile [on/off/reset/perintah] - Profil latensi handler\n"
+        usage += f" {message.text.split()[0]} reload - Muat ulang pengaturan dan emoji"
         return await msg.edit(usage)
 
 # Fungsi helper untuk menambahkan teks autobc (legacy)
 async def add_auto_text(client, text):
     """Legacy function for backward compatibility"""
-    auto_text = await get_vars(client.me.id, "AUTO_TEXT") or []
+    auto_text = await SETTINGS.get(client.me.id, "AUTO_TEXT") or []
     # Check if auto_text contains dictionaries already (new format)
     if auto_text and isinstance(auto_text[0], dict):
         auto_text.append({"type": "text", "content": text})
     else:
         # Old format - just append the text
         auto_text.append(text)
-    await set_vars(client.me.id, "AUTO_TEXT", auto_text)
+    await SETTINGS.set(client.me.id, "AUTO_TEXT", auto_text)
 
 # Fungsi helper untuk menambahkan pesan autobc dengan target grup tertentu
 async def add_auto_message(client, message, text=None, target_group=None):
@@ -1154,7 +3515,7 @@ async def add_auto_message(client, message, text=None, target_group=None):
         target_group: ID grup target atau "default" untuk semua grup
     """
     # Retrieve existing auto_messages
-    auto_messages = await get_vars(client.me.id, "AUTO_TEXT") or {}
+    auto_messages = await SETTINGS.get(client.me.id, "AUTO_TEXT") or {}
     
     # Convert to new format if needed
     if isinstance(auto_messages, list):
@@ -1186,22 +3547,85 @@ async def add_auto_message(client, message, text=None, target_group=None):
                 "content": text
             }
             auto_messages[target_group].append(msg_data)
+            # Parse sekarang supaya putaran autobc berikutnya langsung memakai cache
+            try:
+                await PARSED_TEXT.get(client, text)
+            except Exception:
+                pass
     
     # Save updated auto_messages
-    await set_vars(client.me.id, "AUTO_TEXT", auto_messages)
+    await SETTINGS.set(client.me.id, "AUTO_TEXT", auto_messages)
+
+# Fan-out bcubot: jumlah akun yang diproses bersamaan dan akun yang sudah tidak memblokir bot
+BCUBOT_CONCURRENCY = 10
+BOT_UNBLOCKED = set()  # user_id
+
+
+async def unblock_bot(client, username, force=False):
+    """Buka blokir bot, dilewati bila akun ini sudah tercatat tidak memblokir bot"""
+    if force:
+        BOT_UNBLOCKED.discard(client.me.id)
+    if client.me.id not in BOT_UNBLOCKED:
+        await client.unblock_user(username)
+        BOT_UNBLOCKED.add(client.me.id)
+
 
 @PY.BOT("bcubot")
 @PY.ADMIN
+@PROFILER.track("bcubot")
 async def broadcast_bot(client, message):
     msg = await message.reply("<b>s ss  s</b>", quote=True)
-    done = 0
     if not message.reply_to_message:
         return await msg.edit("<b> s s</b>")
-    for x in ubot._ubot:
-        try:
-            await x.unblock_user(bot.me.username)
-            await message.reply_to_message.forward(x.me.id)
-            done += 1
-        except Exception:
-            pass
-    return await msg.edit(f" s  s  {done} ")
+
+    reply = message.reply_to_message
+    username = bot.me.username
+    semaphore = asyncio.Semaphore(BCUBOT_CONCURRENCY)
+    results = {}  # user_id -> (berhasil, nama error, detik)
+
+    async def deliver(user_id, account=None):
+        # account diisi untuk akun di worker ini, None untuk akun di shard lain
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                if account:
+                    await unblock_bot(account, username)
+                try:
+                    await reply.forward(user_id)
+                except UserIsBlocked:
+                    # Akun memblokir bot lagi sejak terakhir dicek, buka ulang lalu coba sekali lagi
+                    if account:
+                        await unblock_bot(account, username, force=True)
+                    else:
+                        await shard_request(
+                            shard_of(user_id), {"cmd": "unblock", "username": username, "force": [user_id]}
+                        )
+                    await reply.forward(user_id)
+                except FloodWait as e:
+                    await asyncio.sleep(e.value)
+                    await reply.forward(user_id)
+                results[user_id] = (True, None, time.monotonic() - started)
+            except Exception as e:
+                results[user_id] = (False, type(e).__name__, time.monotonic() - started)
+
+    tasks = [deliver(x.me.id, x) for x in ubot._ubot]
+    # Akun di shard lain: buka blokir di worker masing-masing, lalu bot meneruskan dari sini
+    for response in (await other_shards({"cmd": "unblock", "username": username})).values():
+        response = response or {}
+        tasks += [deliver(user_id) for user_id in response.get("ids", [])]
+        for user_id, error in response.get("failed", {}).items():
+            results[int(user_id)] = (False, error, 0.0)
+    await asyncio.gather(*tasks)
+
+    done = sum(1 for ok, _, _ in results.values() if ok)
+    failed = {user_id: error for user_id, (ok, error, _) in results.items() if not ok}
+    timings = sorted(((seconds, user_id) for user_id, (_, _, seconds) in results.items()), reverse=True)
+    report = f"\n\n<b>Gagal: {len(failed)}</b>"
+    for user_id, error in list(failed.items())[:20]:
+        report += f"\n<code>{user_id}</code> - {error}"
+    if timings:
+        average = sum(seconds for seconds, _ in timings) / len(timings)
+        report += f"\n\n<b>Waktu rata-rata: {average:.2f} detik, terlama:</b>"
+        for seconds, user_id in timings[:5]:
+            report += f"\n<code>{user_id}</code> - {seconds:.2f} detik"
+    return await msg.edit(f" s  s  {done} " + report)
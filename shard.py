@@ -0,0 +1,198 @@
+"""
+Supervisor sharding: menjalankan N worker userbot, masing-masing dengan event loop sendiri.
+
+Setiap worker dijalankan dengan UBOT_SHARDS, UBOT_SHARD_INDEX dan UBOT_SHARD_PORT.
+Worker bawaan (shard.py --worker) menyaring get_userbots() dengan user_id % N
+sebelum PyroUbot menyalakan akun, jadi setiap sesi hanya login dari satu proses.
+Bot hanya berjalan di shard 0, dan port kontrol lokal dipakai untuk meneruskan
+perintah antar shard serta melaporkan kesehatan. Worker yang mati dijalankan ulang.
+Ekspor metrik ikut dipisah: shard i memakai BROADCAST_METRICS_PORT + i dan
+file BROADCAST_METRICS_FILE dengan akhiran .shard<i>.
+
+Contoh:
+    python shard.py -n 4
+    python shard.py -n 4 --port 47100 -- python3 shard.py --worker --module PyroUbot
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import runpy
+import signal
+import sys
+import time
+
+RESTART_DELAY = 5  # detik, dilipatgandakan bila worker terus mati
+RESTART_DELAY_MAX = 300
+STOP_TIMEOUT = 30  # detik menunggu worker berhenti sebelum di-kill
+WORKER_MODULE = "PyroUbot"
+
+
+class Worker:
+    def __init__(self, index, shards, port, command):
+        self.index = index
+        self.shards = shards
+        self.port = port
+        self.command = command
+        self.process = None
+        self.restarts = 0
+        self.started = 0.0
+        self.health = None
+
+    async def start(self):
+        env = dict(
+            os.environ,
+            UBOT_SHARDS=str(self.shards),
+            UBOT_SHARD_INDEX=str(self.index),
+            UBOT_SHARD_PORT=str(self.port),
+        )
+        self.process = await asyncio.create_subprocess_exec(*self.command, env=env)
+        self.started = time.monotonic()
+        print(f"[shard {self.index}] started pid {self.process.pid}")
+
+    async def supervise(self, stopping):
+        delay = RESTART_DELAY
+        while not stopping.is_set():
+            await self.start()
+            code = await self.process.wait()
+            if stopping.is_set():
+                return
+            # Worker yang sempat berjalan lama dianggap sehat, jeda restart direset
+            if time.monotonic() - self.started > RESTART_DELAY_MAX:
+                delay = RESTART_DELAY
+            print(f"[shard {self.index}] exited with {code}, restarting in {delay}s")
+            self.restarts += 1
+            self.health = None
+            try:
+                await asyncio.wait_for(stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, RESTART_DELAY_MAX)
+
+    async def stop(self):
+        if self.process is None or self.process.returncode is not None:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.process.kill()
+
+    async def poll(self, timeout=10):
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection("127.0.0.1", self.port + self.index), timeout
+            )
+            try:
+                writer.write(b'{"cmd": "health"}\n')
+                await writer.drain()
+                self.health = json.loads(await asyncio.wait_for(reader.readline(), timeout))
+            finally:
+                writer.close()
+        except Exception:
+            self.health = None
+
+
+def userbot_id(entry):
+    # get_userbots() PyroUbot mengembalikan dict Client dengan name = user_id
+    return int(entry.get("user_id") or entry["name"])
+
+
+def install_userbot_filter(module, shards, index):
+    """
+    Ganti get_userbots() di semua modul paket module dengan versi yang hanya
+    mengembalikan akun milik shard ini, sebelum __main__ PyroUbot memakainya.
+    """
+    importlib.import_module(module)
+    patched = 0
+    for name, loaded in list(sys.modules.items()):
+        if not (name == module or name.startswith(module + ".")):
+            continue
+        original = getattr(loaded, "get_userbots", None)
+        if original is None:
+            continue
+
+        async def get_userbots(*args, _original=original, **kwargs):
+            return [
+                entry for entry in await _original(*args, **kwargs)
+                if userbot_id(entry) % shards == index
+            ]
+
+        setattr(loaded, "get_userbots", get_userbots)
+        patched += 1
+    if not patched:
+        raise RuntimeError(f"get_userbots tidak ditemukan di paket {module}")
+
+
+def run_worker(module):
+    """Jalankan satu worker: saring akun shard ini lalu jalankan python -m module"""
+    shards = int(os.getenv("UBOT_SHARDS", "1"))
+    index = int(os.getenv("UBOT_SHARD_INDEX", "0"))
+    if shards > 1:
+        install_userbot_filter(module, shards, index)
+    sys.argv = [module]
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+
+
+def format_health(workers):
+    header = f"{'shard':>5} {'pid':>7} {'up_min':>7} {'akun':>5} {'autobc':>6} {'gikes':>5} {'jobs':>5} {'tasks':>6} {'lag_s':>6} {'restart':>7}"
+    lines = [header]
+    for worker in workers:
+        health = worker.health
+        if not health or "error" in health:
+            lines.append(f"{worker.index:>5} {'-':>7} tidak merespons {'':>36} {worker.restarts:>7}")
+            continue
+        scheduler = health["scheduler"]
+        lines.append(
+            f"{worker.index:>5} {health['pid']:>7} {int(health['uptime'] // 60):>7} "
+            f"{health['clients']:>5} {health['autobc']:>6} {health['gcast']:>5} "
+            f"{scheduler['jobs']:>5} {health['tasks']:>6} {scheduler['max_lateness']:>6.2f} "
+            f"{worker.restarts:>7}"
+        )
+    return "\n".join(lines)
+
+
+async def run(args):
+    workers = [Worker(index, args.workers, args.port, args.command) for index in range(args.workers)]
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    supervisors = [asyncio.create_task(worker.supervise(stopping)) for worker in workers]
+    while not stopping.is_set():
+        try:
+            await asyncio.wait_for(stopping.wait(), args.interval)
+        except asyncio.TimeoutError:
+            await asyncio.gather(*(worker.poll() for worker in workers))
+            print(format_health(workers), flush=True)
+
+    print("stopping workers...")
+    await asyncio.gather(*(worker.stop() for worker in workers))
+    await asyncio.gather(*supervisors, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=47100, help="port kontrol shard 0, shard i memakai port + i")
+    parser.add_argument("--interval", type=int, default=60, help="jeda laporan kesehatan (detik)")
+    parser.add_argument("--worker", action="store_true", help="jalankan satu worker (dipakai supervisor)")
+    parser.add_argument("--module", default=WORKER_MODULE, help="paket userbot yang dijalankan worker")
+    parser.add_argument(
+        "command", nargs=argparse.REMAINDER, help="perintah worker (default: python shard.py --worker)"
+    )
+    args = parser.parse_args()
+    if args.worker:
+        return run_worker(args.module)
+    if args.command and args.command[0] == "--":
+        args.command = args.command[1:]
+    if not args.command:
+        args.command = [sys.executable, os.path.abspath(__file__), "--worker", "--module", args.module]
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()